@@ -27,6 +27,15 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
 # file. This includes Django's development server, if the WSGI_APPLICATION
 # setting points here.
 application = get_asgi_application()
+
+# Spawn the solver processes now rather than in the first request that solves. Only the processes that
+# serve requests load this file, management commands do not. Under gunicorn --preload this runs in the
+# master, and each forked worker starts its own pool on first use instead. Imported from the package the
+# URLconf loads the views from, whose pool the solves use.
+from tribunales_evau.tribunales.solvers.pool import get_pool  # noqa: E402
+
+get_pool()
+
 # Apply WSGI middleware here.
 # from helloworld.wsgi import HelloWorldApplication
 # application = HelloWorldApplication(application)
@@ -315,3 +315,29 @@ VUE_FRONTEND_USE_TYPESCRIPT = False
 
 CSRF_TRUSTED_ORIGINS = env.list("CSRF_TRUSTED_ORIGINS")
 WHITENOISE_MANIFEST_STRICT = env.list("WHITENOISE_MANIFEST_STRICT")
+
+# Tribunales
+# ------------------------------------------------------------------------------
+# Engine used by get_moves: "auto" (by instance size), "native", "highs", "cbc" or "heuristic"
+TRIBUNALES_SOLVER_BACKEND = env("TRIBUNALES_SOLVER_BACKEND", default="auto")
+# Seconds a single solve may take before the best plan found so far is returned
+TRIBUNALES_SOLVER_TIME_LIMIT = env.float("TRIBUNALES_SOLVER_TIME_LIMIT", default=60)
+# MILP formulation for the cbc and highs backends: "tight" or "bigm" (global M)
+TRIBUNALES_SOLVER_FORMULATION = env("TRIBUNALES_SOLVER_FORMULATION", default="tight")
+# Threads per web process solving get_moves in the background, 0 to solve inline.
+# The job state lives in the default cache, which must be shared by the web processes
+TRIBUNALES_SOLVE_WORKERS = env.int("TRIBUNALES_SOLVE_WORKERS", default=2)
+# Solves running at once on the host, across all processes (0: no limit)
+TRIBUNALES_SOLVE_SLOTS = env.int("TRIBUNALES_SOLVE_SLOTS", default=2)
+# Solves waiting for a slot before new ones are turned away as busy
+TRIBUNALES_SOLVE_QUEUE_DEPTH = env.int("TRIBUNALES_SOLVE_QUEUE_DEPTH", default=8)
+# Directory of the slot lock files, shared by the processes (default: <tmp>/tribunales-solve)
+TRIBUNALES_SOLVE_LOCK_DIR = env("TRIBUNALES_SOLVE_LOCK_DIR", default="")
+# Threads a single solve may use (CBC)
+TRIBUNALES_SOLVER_THREADS = env.int("TRIBUNALES_SOLVER_THREADS", default=1)
+# Long-lived processes the solver backends run in, 0 to solve in the calling process
+TRIBUNALES_SOLVER_PROCESSES = env.int("TRIBUNALES_SOLVER_PROCESSES", default=2)
+# A solver process is replaced after this many solves
+TRIBUNALES_SOLVER_MAX_SOLVES = env.int("TRIBUNALES_SOLVER_MAX_SOLVES", default=100)
+# or once its peak memory has grown this many MB
+TRIBUNALES_SOLVER_MAX_MEMORY = env.int("TRIBUNALES_SOLVER_MAX_MEMORY", default=500)
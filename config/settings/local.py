@@ -22,7 +22,13 @@ CACHES = {
         # "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
         "BACKEND": "django.core.cache.backends.db.DatabaseCache",
         "LOCATION": "dbcache",
-    }
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    # Plans memoized by instance (tribunales.solvers.memo), kept apart so they cannot evict the default entries
+    "memo": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "dbcache_memo",
+    },
 }
 
 # EMAIL
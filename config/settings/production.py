@@ -15,6 +15,23 @@ DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # no
 
 # CACHES
 # ------------------------------------------------------------------------------
+# Shared by the web processes, the background solve jobs keep their state here.
+# The tables are created with `python manage.py createcachetable` (see the README).
+# The default cache holds two plans and a job state per asignatura and fecha, keep
+# MAX_ENTRIES well above three times their number: a full cache culls plans first.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "dbcache",
+        "OPTIONS": {"MAX_ENTRIES": env.int("DJANGO_CACHE_MAX_ENTRIES", default=5000)},
+    },
+    # Plans memoized by instance (tribunales.solvers.memo), kept apart so they cannot evict the default entries
+    "memo": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "dbcache_memo",
+        "OPTIONS": {"MAX_ENTRIES": env.int("DJANGO_MEMO_CACHE_MAX_ENTRIES", default=5000)},
+    },
+}
 # CACHES = {
 #     "default": {
 #         "BACKEND": "django_redis.cache.RedisCache",
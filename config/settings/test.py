@@ -35,3 +35,5 @@ TEMPLATES[0]["OPTIONS"]["debug"] = True  # type: ignore # noqa: F405
 MEDIA_URL = "http://media.testserver"
 # Your stuff...
 # ------------------------------------------------------------------------------
+TRIBUNALES_SOLVE_WORKERS = 0
+TRIBUNALES_SOLVER_PROCESSES = 0
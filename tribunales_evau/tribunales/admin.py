@@ -1,9 +1,14 @@
+from datetime import timedelta
+from math import ceil
+
 from django.contrib import admin
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
 from import_export.fields import Field
 from import_export.widgets import DateWidget
-from tribunales.models import Asignatura, Evaluador, Examen, Sede
+from tribunales.models import Asignatura, Evaluador, Examen, Sede, SolveRecord
 
 
 class SedeResource(resources.ModelResource):
@@ -48,6 +53,58 @@ class ExamenAdmin(ImportExportModelAdmin):
     resource_classes = [ExamenResource]
 
 
+# Days of SolveRecord rows the changelist statistics cover
+SOLVE_STATS_DAYS = 30
+
+
+def percentile(records, field, fraction, count):
+    """Nearest-rank percentile of ``field`` over ``count`` rows, fetching a single row."""
+    if not count:
+        return None
+    return records.order_by(field).values_list(field, flat=True)[ceil(fraction * count) - 1]
+
+
+class SolveRecordAdmin(admin.ModelAdmin):
+    list_display = [
+        "KEY",
+        "BACKEND",
+        "SEDES",
+        "VARIABLES",
+        "CONSTRAINTS",
+        "BUILD_TIME",
+        "SOLVE_TIME",
+        "OBJECTIVE",
+        "OPTIMAL",
+        "WAIT_TIME",
+        "CREATED",
+    ]
+    list_filter = ["BACKEND", "OPTIMAL"]
+    search_fields = ["KEY"]
+
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context=extra_context)
+        if not hasattr(response, "context_data") or "cl" not in response.context_data:
+            return response
+
+        # Aggregates over the filtered rows of the last days, every row is a cache miss
+        records = (
+            response.context_data["cl"]
+            .queryset.order_by()
+            .filter(CREATED__gte=timezone.now() - timedelta(days=SOLVE_STATS_DAYS))
+        )
+        misses = records.count()
+        response.context_data["solve_stats"] = {
+            "days": SOLVE_STATS_DAYS,
+            "misses": misses,
+            "p95_solve_time": percentile(records, "SOLVE_TIME", 0.95, misses),
+            "p95_wait_time": percentile(records, "WAIT_TIME", 0.95, misses),
+            "slowest_keys": records.values("KEY")
+            .annotate(max_solve_time=Max("SOLVE_TIME"), avg_solve_time=Avg("SOLVE_TIME"), misses=Count("id"))
+            .order_by("-max_solve_time")[:10],
+        }
+        return response
+
+
 if Sede not in admin.site._registry:
     admin.site.register(Sede, SedeAdmin)
 if Asignatura not in admin.site._registry:
@@ -56,3 +113,5 @@ if Evaluador not in admin.site._registry:
     admin.site.register(Evaluador, EvaluadorAdmin)
 if Examen not in admin.site._registry:
     admin.site.register(Examen, ExamenAdmin)
+if SolveRecord not in admin.site._registry:
+    admin.site.register(SolveRecord, SolveRecordAdmin)
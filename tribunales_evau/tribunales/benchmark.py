@@ -0,0 +1,91 @@
+import logging
+import random
+import time
+
+from django.db import transaction
+from django.db.models import Max
+from tribunales.models import Asignatura, Evaluador, Examen, Sede
+
+from .solvers import count_exchanges
+from .views import get_hqs, problem_solve, split_hqs
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_SIZES = [10, 20, 50, 100, 200, 500]
+BENCHMARK_FECHA = "2000-01-01"
+
+# Evaluadores per sede and exams per evaluador, as in the EvAU .dzn files
+EVALS_WEIGHTS = {0: 5, 1: 70, 2: 20, 3: 5}
+EXAMS_PER_EVAL = (150, 35)
+
+
+def generate_instance(n_sedes, seed=0):
+    """Return ``n_sedes`` ``(exams, evals)`` pairs, the same for the same seed."""
+    rng = random.Random(f"{seed}-{n_sedes}")
+    instance = []
+    for _ in range(n_sedes):
+        evals = rng.choices(list(EVALS_WEIGHTS), weights=list(EVALS_WEIGHTS.values()))[0]
+        exams = sum(max(round(rng.gauss(*EXAMS_PER_EVAL)), 0) for _ in range(evals))
+        instance.append((exams, evals))
+    return instance
+
+
+def load_instance(instance, fecha=BENCHMARK_FECHA, name="BENCHMARK"):
+    # bulk_create does not return ids on MySQL, so the new sedes are numbered here
+    first = (Sede.objects.aggregate(Max("COD_SEDE"))["COD_SEDE__max"] or 0) + 1
+    sedes = Sede.objects.bulk_create(
+        [Sede(COD_SEDE=first + i, UBICACION=f"{name} {i + 1}") for i in range(len(instance))]
+    )
+    asignatura = Asignatura.objects.create(ASIGNATURA=name)
+    Evaluador.objects.bulk_create(
+        [
+            Evaluador(COD_SEDE=sede, COD_ASIGNATURA=asignatura, EVALUADORES=evals)
+            for sede, (exams, evals) in zip(sedes, instance)
+        ]
+    )
+    Examen.objects.bulk_create(
+        [
+            Examen(COD_SEDE=sede, COD_ASIGNATURA=asignatura, EXAMENES=exams, FECHA=fecha)
+            for sede, (exams, evals) in zip(sedes, instance)
+        ]
+    )
+    return asignatura
+
+
+def benchmark_instance(instance, backend=None, time_limit=None):
+    # The rows are rolled back, the database is left as it was
+    with transaction.atomic():
+        asignatura = load_instance(instance)
+
+        start = time.perf_counter()
+        headquarter_data = get_hqs(asignatura, BENCHMARK_FECHA)
+        hqs_time = time.perf_counter() - start
+
+        transaction.set_rollback(True)
+
+    mean, HQs_from, HQs_to = split_hqs(headquarter_data)
+    result = problem_solve(
+        headquarter_data, mean, HQs_from, HQs_to, backend=backend, time_limit=time_limit, use_memo=False
+    )
+    return {
+        "sedes": len(instance),
+        "imbalanced": result["sedes"],
+        "n_vars": result["n_vars"],
+        "n_constraints": result["n_constraints"],
+        "hqs_time": hqs_time,
+        "build_time": result["build_time"],
+        "solve_time": result["solve_time"],
+        "exchanges": count_exchanges(result["move_details"]),
+        "bound": result["bound"],
+        "optimal": result["optimal"],
+        "backend": result["backend"],
+    }
+
+
+def run_benchmark(sizes=None, seed=0, backend=None, time_limit=None):
+    results = []
+    for n_sedes in sizes or BENCHMARK_SIZES:
+        result = benchmark_instance(generate_instance(n_sedes, seed), backend=backend, time_limit=time_limit)
+        logger.debug(f"Benchmark {n_sedes} sedes: {result}")
+        results.append(result)
+    return results
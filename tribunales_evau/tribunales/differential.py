@@ -0,0 +1,111 @@
+"""
+Differential check of the solver engines: every engine solves the same
+seeded random instances, every plan must be feasible and every plan proven
+optimal must have the same number of exchanges.
+"""
+import logging
+import os
+import random
+
+from . import solvers
+from .dzn import format_dzn
+from .solvers import BACKENDS, count_exchanges
+from .solvers.cbc import CBCBackend
+from .solvers.highs import HiGHSBackend
+from .views import get_imbalances, split_hqs
+
+logger = logging.getLogger(__name__)
+
+
+def get_engines():
+    engines = {name: backend.solve for name, backend in BACKENDS.items() if backend.available()}
+    for backend_class in (CBCBackend, HiGHSBackend):
+        backend = backend_class(formulation="bigm")
+        if backend.available():
+            engines[backend.name + "-bigm"] = backend.solve
+
+    # The whole pipeline: presolve, greedy short circuit and automatic backend selection
+    def pipeline(surplus, deficit):
+        return solvers.solve(surplus, deficit, use_memo=False)
+
+    engines["pipeline"] = pipeline
+    return engines
+
+
+def generate_instance(rng, max_sedes):
+    while True:
+        instance = []
+        for _ in range(rng.randint(2, max_sedes)):
+            evals = rng.choice([0, 1, 1, 1, 2, 3])
+            instance.append((rng.randint(0, 12 * evals + 4), evals))
+        if sum(evals for exams, evals in instance):
+            return instance
+
+
+def check_plan(move_details, surplus, deficit):
+    """Problems found in ``move_details``, empty if it is a feasible plan."""
+    if move_details is None:
+        return ["no plan"]
+    errors = []
+    sent = dict.fromkeys(surplus, 0)
+    received = dict.fromkeys(deficit, 0)
+    for HQ_from, moves in move_details.items():
+        for HQ_to, n_exams in moves.items():
+            if HQ_from not in surplus or HQ_to not in deficit:
+                errors.append(f"{HQ_from} -> {HQ_to} is not a sender -> receiver pair")
+                continue
+            if not isinstance(n_exams, int) or not 0 < n_exams <= min(surplus[HQ_from], deficit[HQ_to]):
+                errors.append(f"{HQ_from} -> {HQ_to} moves {n_exams} exams")
+            sent[HQ_from] += n_exams
+            received[HQ_to] += n_exams
+    errors += [f"{hq} sends {sent[hq]} of {surplus[hq]}" for hq in surplus if sent[hq] != max(surplus[hq], 0)]
+    errors += [f"{hq} receives {received[hq]} of {deficit[hq]}" for hq in deficit if received[hq] > deficit[hq]]
+    return errors
+
+
+def check_instance(instance, engines):
+    headquarter_data = {str(i + 1): {"exams": exams, "evals": evals} for i, (exams, evals) in enumerate(instance)}
+    mean, HQs_from, HQs_to = split_hqs(headquarter_data)
+    surplus, deficit = get_imbalances(headquarter_data, mean, HQs_from, HQs_to)
+
+    errors = []
+    exchanges = {}
+    for name, solve in engines.items():
+        try:
+            result = solve(surplus, deficit)
+        except Exception as e:
+            errors.append(f"{name}: {type(e).__name__}: {e}")
+            continue
+        errors += [f"{name}: {error}" for error in check_plan(result["move_details"], surplus, deficit)]
+        if result["move_details"] is not None:
+            exchanges[name] = (count_exchanges(result["move_details"]), result["optimal"])
+
+    if exchanges:
+        best = min(n for n, optimal in exchanges.values())
+        for name, (n, optimal) in exchanges.items():
+            if optimal and n != best:
+                errors.append(f"{name}: {n} exchanges proven optimal, {best} found")
+    return errors
+
+
+def run_check(n_instances, seed=0, max_sedes=10, output_dir=None, engines=None):
+    """
+    Check ``n_instances`` random instances of 2 to ``max_sedes`` sedes.
+    Returns ``[(instance, errors), ...]`` for the failing ones, which are also
+    written to ``output_dir`` as .dzn files if given.
+    """
+    engines = engines or get_engines()
+    rng = random.Random(seed)
+    failures = []
+    for index in range(n_instances):
+        instance = generate_instance(rng, max_sedes)
+        errors = check_instance(instance, engines)
+        if not errors:
+            continue
+        logger.warning(f"Instance {index} (seed {seed}) failed: {errors}")
+        failures.append((instance, errors))
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            with open(os.path.join(output_dir, f"check_{seed}_{index}.dzn"), "w") as file:
+                file.write(format_dzn(instance, comments=errors))
+    return failures
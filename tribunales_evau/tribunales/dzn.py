@@ -0,0 +1,39 @@
+import os
+import re
+
+N_PATTERN = re.compile(r"\bn\s*=\s*(\d+)\s*;")
+HEADQUARTER_PATTERN = re.compile(r"\bheadquarter\s*=\s*\[\|(.*?)\|\]\s*;", re.DOTALL)
+
+
+def parse_dzn(text):
+    """
+    Parse a MiniZinc instance (``n=...; headquarter=[|exams,evals|...|];``)
+    into a list of ``(exams, evals)`` pairs, one per sede.
+    """
+    n = N_PATTERN.search(text)
+    headquarter = HEADQUARTER_PATTERN.search(text)
+    if n is None or headquarter is None:
+        raise ValueError("Expected 'n=...;' and 'headquarter=[|...|];'")
+
+    instance = []
+    for row in headquarter.group(1).split("|"):
+        if row.strip():
+            exams, evals = (int(value) for value in row.split(","))
+            instance.append((exams, evals))
+    if len(instance) != int(n.group(1)):
+        raise ValueError(f"n={n.group(1)} but headquarter has {len(instance)} rows")
+    return instance
+
+
+def format_dzn(instance, comments=()):
+    """Inverse of ``parse_dzn``, laid out like the files in testfiles/."""
+    width = max((len(str(exams)) for exams, evals in instance), default=1)
+    rows = [f"{exams:>{width}},{evals}" for exams, evals in instance]
+    lines = [f"n={len(instance)};", "headquarter=[|" + "\n             |".join(rows + [""]) + "];"]
+    return "\n".join(lines + [f"% {comment}" for comment in comments]) + "\n"
+
+
+def asignatura_name(filename):
+    # EvAU_BIOLOGIA_2022.dzn -> BIOLOGIA
+    parts = os.path.splitext(os.path.basename(filename))[0].split("_")
+    return "_".join(parts[1:-1]) if len(parts) > 2 else parts[-1]
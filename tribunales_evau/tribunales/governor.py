@@ -0,0 +1,81 @@
+"""
+Host-wide limit on concurrent solves. A solve holds one of
+TRIBUNALES_SOLVE_SLOTS lock files while it runs and, when they are all
+taken, waits holding one of TRIBUNALES_SOLVE_QUEUE_DEPTH queue lock files.
+The locks are shared by every web and worker process on the host and the
+kernel releases them if a process dies, so a crash never leaks a slot.
+"""
+import fcntl
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to take a slot while queued
+POLL_INTERVAL = 0.05
+
+
+class SolverBusy(Exception):
+    pass
+
+
+def get_lock_dir():
+    lock_dir = getattr(settings, "TRIBUNALES_SOLVE_LOCK_DIR", None) or os.path.join(
+        tempfile.gettempdir(), "tribunales-solve"
+    )
+    os.makedirs(lock_dir, exist_ok=True)
+    return lock_dir
+
+
+def _take(prefix, n):
+    # flock locks belong to the open file, so threads of one process also exclude each other
+    lock_dir = get_lock_dir()
+    for i in range(n):
+        fd = os.open(os.path.join(lock_dir, f"{prefix}{i}.lock"), os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+        else:
+            return fd
+    return None
+
+
+@contextmanager
+def solve_slot():
+    """
+    Wait for a free solve slot and yield the seconds waited. Raises
+    SolverBusy if the queue is full too. TRIBUNALES_SOLVE_SLOTS = 0 turns the
+    limit off.
+    """
+    slots = settings.TRIBUNALES_SOLVE_SLOTS
+    if not slots:
+        yield 0.0
+        return
+
+    wait_time = 0.0
+    fd = _take("slot", slots)
+    if fd is None:
+        start = time.monotonic()
+        queue_fd = _take("queue", settings.TRIBUNALES_SOLVE_QUEUE_DEPTH)
+        if queue_fd is None:
+            raise SolverBusy("Hay demasiados repartos calculándose ahora mismo, se reintentará en unos segundos")
+        try:
+            while fd is None:
+                time.sleep(POLL_INTERVAL)
+                fd = _take("slot", slots)
+        finally:
+            os.close(queue_fd)
+        wait_time = time.monotonic() - start
+        logger.debug(f"Waited {wait_time:.3f}s for a solve slot")
+
+    try:
+        yield wait_time
+    finally:
+        # Closing the file releases the lock
+        os.close(fd)
@@ -0,0 +1,90 @@
+"""
+Background solve jobs. Jobs run in a thread pool inside the web process and
+their state is kept in the cache, so any worker can answer a status poll
+without an external broker. That needs a cache shared by the web processes
+(database, memcached or Redis): with the per-process LocMemCache each
+process that gets a poll sees no job and submits it again.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .governor import SolverBusy
+
+logger = logging.getLogger(__name__)
+
+JOB_PREFIX = "job_"
+# A job not finished after this many seconds is considered lost and can be resubmitted
+JOB_TIMEOUT = 60 * 30
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Not run because the host-wide solve queue was full
+BUSY = "busy"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.TRIBUNALES_SOLVE_WORKERS, thread_name_prefix="tribunales-solve"
+            )
+    return _executor
+
+
+def status(job_id):
+    return cache.get(JOB_PREFIX + job_id)
+
+
+def forget(job_id):
+    cache.delete(JOB_PREFIX + job_id)
+
+
+def _set_status(job_id, state, error=None):
+    cache.set(JOB_PREFIX + job_id, {"state": state, "error": error}, timeout=JOB_TIMEOUT)
+
+
+def _run(job_id, func, args, kwargs):
+    _set_status(job_id, RUNNING)
+    try:
+        func(*args, **kwargs)
+    except SolverBusy as e:
+        _set_status(job_id, BUSY, str(e))
+    except Exception as e:
+        logger.exception(f"Solve job {job_id} failed")
+        _set_status(job_id, FAILED, str(e))
+    else:
+        _set_status(job_id, DONE)
+    finally:
+        if settings.TRIBUNALES_SOLVE_WORKERS:
+            # Worker threads open their own connection, don't leave it behind
+            connection.close()
+
+
+def submit(job_id, func, *args, **kwargs):
+    """
+    Run ``func(*args, **kwargs)`` in the background unless a job with this id
+    is already queued or running, and return the job status. With
+    TRIBUNALES_SOLVE_WORKERS = 0 the job runs right away in the caller.
+    """
+    if not cache.add(JOB_PREFIX + job_id, {"state": QUEUED, "error": None}, timeout=JOB_TIMEOUT):
+        current = status(job_id)
+        if current is not None and current["state"] in (QUEUED, RUNNING):
+            return current
+        _set_status(job_id, QUEUED)
+
+    if settings.TRIBUNALES_SOLVE_WORKERS:
+        get_executor().submit(_run, job_id, func, args, kwargs)
+    else:
+        _run(job_id, func, args, kwargs)
+    return status(job_id)
@@ -0,0 +1,59 @@
+import json
+import subprocess
+import sys
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...benchmark import BENCHMARK_SIZES, run_benchmark
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return ""
+
+
+class Command(BaseCommand):
+    help = "Time get_hqs, the model build and the solve on synthetic instances of growing size"
+    name = "benchmark_moves"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=BENCHMARK_SIZES, help="Number of sedes of each instance"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--backend", help="Solver backend, automatic selection if not given")
+        parser.add_argument("--time-limit", type=float, help="Solver time limit per instance, in seconds")
+        parser.add_argument("--output", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        results = run_benchmark(
+            sizes=options["sizes"], seed=options["seed"], backend=options["backend"], time_limit=options["time_limit"]
+        )
+
+        self.stdout.write(f"{'sedes':>6} {'vars':>8} {'hqs (s)':>9} {'build (s)':>10} {'solve (s)':>10}  result")
+        for result in results:
+            status = "optimal" if result["optimal"] else f"bound {result['bound']}"
+            self.stdout.write(
+                f"{result['sedes']:>6} {result['n_vars']:>8} {result['hqs_time']:>9.4f} "
+                f"{result['build_time']:>10.4f} {result['solve_time']:>10.4f}  "
+                f"{result['exchanges']} exchanges, {status} ({result['backend']})"
+            )
+
+        if options["output"]:
+            report = {
+                "commit": get_commit(),
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "seed": options["seed"],
+                "time_limit": options["time_limit"],
+                "results": results,
+            }
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...differential import get_engines, run_check
+
+
+class Command(BaseCommand):
+    help = "Solve seeded random instances with every solver engine and check that their plans agree"
+    name = "check_solvers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--instances", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--max-sedes", type=int, default=10)
+        parser.add_argument("--output-dir", default="solver_failures", help="Where the failing instances are written")
+
+    def handle(self, *args, **options):
+        engines = get_engines()
+        self.stdout.write(f"Engines: {', '.join(engines)}")
+        failures = run_check(
+            options["instances"],
+            seed=options["seed"],
+            max_sedes=options["max_sedes"],
+            output_dir=options["output_dir"],
+            engines=engines,
+        )
+        for instance, errors in failures:
+            self.stdout.write(f"{instance}: {'; '.join(errors)}")
+        if failures:
+            raise CommandError(
+                f"{len(failures)} of {options['instances']} instances failed, see {options['output_dir']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{options['instances']} instances checked"))
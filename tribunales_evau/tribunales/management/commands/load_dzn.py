@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from tribunales.models import (
+    Asignatura,
+    Evaluador,
+    Examen,
+    Sede,
+    invalidate_catalog,
+    invalidate_sede_names,
+    moves_cache_key,
+)
+
+from ...dzn import asignatura_name, parse_dzn
+
+
+class Command(BaseCommand):
+    help = "Load MiniZinc .dzn instances as the Examen and Evaluador rows of an asignatura and fecha"
+    name = "load_dzn"
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+", help=".dzn files, row i is the sede with COD_SEDE=i+1")
+        parser.add_argument("--fecha", required=True, help="Fecha of the exams (YYYY-MM-DD)")
+        parser.add_argument(
+            "--asignatura", help="Asignatura name for a single file, taken from the file name (EvAU_<NAME>_<year>.dzn)"
+        )
+
+    def handle(self, *args, **options):
+        if options["asignatura"] and len(options["files"]) > 1:
+            raise CommandError("--asignatura can only be used with a single file")
+
+        instances = {}
+        for filename in options["files"]:
+            try:
+                with open(filename) as file:
+                    instance = parse_dzn(file.read())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"{filename}: {e}")
+            # A later file for the same asignatura replaces the earlier one
+            instances[options["asignatura"] or asignatura_name(filename)] = instance
+
+        fecha = options["fecha"]
+        with transaction.atomic():
+            n_sedes = max(len(instance) for instance in instances.values())
+            existing = set(Sede.objects.filter(COD_SEDE__lte=n_sedes).values_list("COD_SEDE", flat=True))
+            Sede.objects.bulk_create(
+                [Sede(COD_SEDE=i, UBICACION=f"Sede {i}") for i in range(1, n_sedes + 1) if i not in existing]
+            )
+
+            # bulk_create does not return ids on MySQL, so the asignaturas are fetched back by name
+            existing = set(Asignatura.objects.filter(ASIGNATURA__in=instances).values_list("ASIGNATURA", flat=True))
+            Asignatura.objects.bulk_create([Asignatura(ASIGNATURA=name) for name in instances if name not in existing])
+            asignaturas = {}
+            for asignatura in Asignatura.objects.filter(ASIGNATURA__in=instances).order_by("-COD_ASIGNATURA"):
+                asignaturas[asignatura.ASIGNATURA] = asignatura
+
+            Examen.objects.filter(COD_ASIGNATURA__in=asignaturas.values(), FECHA=fecha).delete()
+            Evaluador.objects.filter(COD_ASIGNATURA__in=asignaturas.values()).delete()
+            examenes = []
+            evaluadores = []
+            for name, instance in instances.items():
+                for i, (exams, evals) in enumerate(instance, 1):
+                    examenes.append(
+                        Examen(COD_SEDE_id=i, COD_ASIGNATURA=asignaturas[name], EXAMENES=exams, FECHA=fecha)
+                    )
+                    evaluadores.append(Evaluador(COD_SEDE_id=i, COD_ASIGNATURA=asignaturas[name], EVALUADORES=evals))
+            Examen.objects.bulk_create(examenes)
+            Evaluador.objects.bulk_create(evaluadores)
+
+        # bulk_create does not send post_save, so the cached plans are dropped here
+        cache.delete_many([moves_cache_key(asignatura.COD_ASIGNATURA, fecha) for asignatura in asignaturas.values()])
+        invalidate_catalog()
+        invalidate_sede_names()
+
+        for name, instance in instances.items():
+            self.stdout.write(f"{name} ({fecha}): {len(instance)} sedes")
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(instances)} instances"))
@@ -0,0 +1,111 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from tribunales.models import Asignatura, moves_cache_key
+
+from ... import governor
+from ...views import compute_moves, get_fechas, get_last_move_details, load_hqs, record_solve, store_moves
+
+# Seconds between attempts to join a full solve queue
+BUSY_RETRY_INTERVAL = 1.0
+
+
+def timed_compute_moves(hqs, time_limit, warm_start, label):
+    # Runs in the worker processes, which never touch the database. Each solve takes a solve slot like
+    # the web requests do, and rather than giving up on a full queue it waits for it to drain
+    start = time.perf_counter()
+    while True:
+        try:
+            with governor.solve_slot():
+                wait_time = time.perf_counter() - start
+                move_data, result = compute_moves(hqs, time_limit=time_limit, warm_start=warm_start, label=label)
+                return move_data, result, time.perf_counter() - start - wait_time, wait_time
+        except governor.SolverBusy:
+            time.sleep(BUSY_RETRY_INTERVAL)
+
+
+class Command(BaseCommand):
+    help = "Precompute the moves of every asignatura and fecha and store them in the cache"
+    name = "warm_moves"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--asignatura", type=int, help="Only this COD_ASIGNATURA")
+        parser.add_argument("--fecha", help="Only this fecha (YYYY-MM-DD)")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Worker processes, 0 to solve in this process "
+            "(default and maximum: TRIBUNALES_SOLVE_SLOTS, or the number of CPUs without a slot limit)",
+        )
+        parser.add_argument("--time-limit", type=float, help="Solver time limit per plan, in seconds")
+        parser.add_argument("--force", action="store_true", help="Recompute plans already in the cache")
+
+    def handle(self, *args, **options):
+        asignaturas = Asignatura.objects.all()
+        if options["asignatura"] is not None:
+            asignaturas = asignaturas.filter(COD_ASIGNATURA=options["asignatura"])
+
+        tasks = []
+        for asignatura in asignaturas:
+            fechas = [
+                fecha
+                for fecha in get_fechas(asignatura)
+                if (not options["fecha"] or str(fecha) == options["fecha"])
+                and (options["force"] or cache.get(moves_cache_key(asignatura.COD_ASIGNATURA, fecha)) is None)
+            ]
+            for fecha, hqs in load_hqs(asignatura, fechas).items():
+                tasks.append(
+                    (asignatura.COD_ASIGNATURA, fecha, hqs, get_last_move_details(asignatura.COD_ASIGNATURA, fecha))
+                )
+
+        self.stdout.write(f"{len(tasks)} plans to compute")
+        if not tasks:
+            return
+
+        # Only TRIBUNALES_SOLVE_SLOTS solves run at once, more workers would just fill the solve queue
+        slots = settings.TRIBUNALES_SOLVE_SLOTS
+        workers = options["workers"]
+        if workers is None:
+            workers = slots or os.cpu_count()
+        elif slots:
+            workers = min(workers, slots)
+
+        start = time.perf_counter()
+        if workers == 0:
+            results = (
+                (task, timed_compute_moves(task[2], options["time_limit"], task[3], moves_cache_key(*task[:2])))
+                for task in tasks
+            )
+            self.report(results, len(tasks))
+        else:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+                futures = {
+                    executor.submit(
+                        timed_compute_moves, task[2], options["time_limit"], task[3], moves_cache_key(*task[:2])
+                    ): task
+                    for task in tasks
+                }
+                self.report(((futures[future], future.result()) for future in as_completed(futures)), len(tasks))
+
+        self.stdout.write(self.style.SUCCESS(f"Computed {len(tasks)} plans in {time.perf_counter() - start:.2f}s"))
+
+    def report(self, results, total):
+        for done, ((cod_asignatura, fecha, *_), (move_data, result, elapsed, wait_time)) in enumerate(results, 1):
+            key = moves_cache_key(cod_asignatura, fecha)
+            if result is None:
+                self.stdout.write(f"[{done}/{total}] {key}: no data")
+                continue
+            record_solve(cod_asignatura, fecha, result, wait_time=wait_time)
+            store_moves(cod_asignatura, fecha, move_data)
+            status = "optimal" if move_data["optimal"] else f"gap {move_data['gap']:.0%}"
+            self.stdout.write(
+                f"[{done}/{total}] {key}: {move_data['total_moves']} exams moved, {status}, {elapsed:.3f}s"
+            )
@@ -1,9 +1,75 @@
+import time
+import uuid
+
 from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 
+def moves_cache_key(cod_asignatura, fecha):
+    return str(cod_asignatura) + "_" + str(fecha)
+
+
+def last_moves_cache_key(cod_asignatura, fecha):
+    # Last plan computed, kept across invalidations to warm start the next solve
+    return "last_" + moves_cache_key(cod_asignatura, fecha)
+
+
+# Subjects and dates offered by MovesView, and the <option> list rendered from them
+CATALOG_CACHE_KEY = "moves_catalog"
+# Name of the {% cache %} fragment in moves_template.html
+CATALOG_FRAGMENT_NAME = "moves_catalog"
+
+
+def invalidate_catalog():
+    cache.delete_many([CATALOG_CACHE_KEY, make_template_fragment_key(CATALOG_FRAGMENT_NAME)])
+
+
+# Changed whenever a Sede is, so every process sharing the cache reloads its sede directory
+SEDE_DIRECTORY_VERSION_KEY = "sede_directory_version"
+# Seconds a process keeps its sede directory, for changes its cache never hears about
+# (a per-process cache, bulk_create in another process)
+SEDE_DIRECTORY_MAX_AGE = 60
+
+_sede_directory = {"version": None, "loaded": None, "names": {}}
+
+
+def get_sede_names(refresh=False):
+    """
+    ``{str(COD_SEDE): UBICACION}`` of every sede, loaded with one query and
+    kept in the process until a Sede changes or SEDE_DIRECTORY_MAX_AGE
+    seconds pass.
+    """
+    version = cache.get(SEDE_DIRECTORY_VERSION_KEY)
+    if version is None:
+        cache.add(SEDE_DIRECTORY_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(SEDE_DIRECTORY_VERSION_KEY)
+    if (
+        refresh
+        or version is None
+        or _sede_directory["version"] != version
+        or time.monotonic() - _sede_directory["loaded"] > SEDE_DIRECTORY_MAX_AGE
+    ):
+        names = {str(cod_sede): ubicacion for cod_sede, ubicacion in Sede.objects.values_list("COD_SEDE", "UBICACION")}
+        _sede_directory.update(version=version, loaded=time.monotonic(), names=names)
+    return _sede_directory["names"]
+
+
+def get_sede_names_for(cod_sedes):
+    """get_sede_names(), reloaded once if any of ``cod_sedes`` is missing from it."""
+    names = get_sede_names()
+    if not {str(cod_sede) for cod_sede in cod_sedes} <= names.keys():
+        names = get_sede_names(refresh=True)
+    return names
+
+
+def invalidate_sede_names():
+    _sede_directory["version"] = None
+    cache.set(SEDE_DIRECTORY_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
 class Sede(models.Model):
     COD_SEDE = models.AutoField(primary_key=True)
     UBICACION = models.CharField(max_length=100)
@@ -36,6 +102,73 @@ class Evaluador(models.Model):
         constraints = [models.UniqueConstraint(fields=["COD_SEDE", "COD_ASIGNATURA"], name="unique_evaluador")]
 
 
+class SolveRecord(models.Model):
+    # One row per plan computed on a cache miss
+    KEY = models.CharField(max_length=100, db_index=True)
+    SEDES = models.IntegerField()
+    VARIABLES = models.IntegerField()
+    CONSTRAINTS = models.IntegerField()
+    BUILD_TIME = models.FloatField()
+    SOLVE_TIME = models.FloatField()
+    OBJECTIVE = models.IntegerField()
+    OPTIMAL = models.BooleanField()
+    BACKEND = models.CharField(max_length=20)
+    # Seconds queued for a solve slot
+    WAIT_TIME = models.FloatField(default=0.0)
+    CREATED = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["-CREATED"]
+
+
+def invalidate_moves(cod_asignatura, fechas=None):
+    """Drop the cached plans of ``cod_asignatura`` on ``fechas``, all its fechas by default."""
+    if fechas is None:
+        fechas = Examen.objects.filter(COD_ASIGNATURA=cod_asignatura).values_list("FECHA", flat=True).distinct()
+    cache.delete_many([moves_cache_key(cod_asignatura, fecha) for fecha in fechas])
+
+
+@receiver(pre_save, sender=Examen)
+def invalidate_moved_examen(sender, instance, **kwargs):
+    # An Examen moved to another asignatura or fecha leaves the plan of the old one wrong too
+    if instance.pk is None:
+        return
+    old = Examen.objects.filter(pk=instance.pk).values_list("COD_ASIGNATURA", "FECHA").first()
+    if old is not None and (old[0], str(old[1])) != (instance.COD_ASIGNATURA_id, str(instance.FECHA)):
+        invalidate_moves(old[0], [old[1]])
+
+
 @receiver(post_save, sender=Examen)
+@receiver(post_delete, sender=Examen)
 def invalidate_cache(sender, instance, **kwargs):
-    cache.clear()
+    invalidate_moves(instance.COD_ASIGNATURA_id, [instance.FECHA])
+
+
+@receiver(pre_save, sender=Evaluador)
+def invalidate_moved_evaluador(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old = Evaluador.objects.filter(pk=instance.pk).values_list("COD_ASIGNATURA", flat=True).first()
+    if old is not None and old != instance.COD_ASIGNATURA_id:
+        invalidate_moves(old)
+
+
+@receiver(post_save, sender=Evaluador)
+@receiver(post_delete, sender=Evaluador)
+def invalidate_evaluador_cache(sender, instance, **kwargs):
+    # Evaluadores count for every fecha of the asignatura
+    invalidate_moves(instance.COD_ASIGNATURA_id)
+
+
+@receiver(post_save, sender=Examen)
+@receiver(post_delete, sender=Examen)
+@receiver(post_save, sender=Asignatura)
+@receiver(post_delete, sender=Asignatura)
+def invalidate_catalog_cache(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Sede)
+@receiver(post_delete, sender=Sede)
+def invalidate_sede_directory(sender, **kwargs):
+    invalidate_sede_names()
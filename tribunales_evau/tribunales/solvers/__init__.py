@@ -0,0 +1,182 @@
+import logging
+import time
+
+from django.conf import settings
+
+from . import cbc, greedy, heuristic, highs, memo, pool  # noqa: F401 (register the backends)
+from .base import BACKENDS, SolverBackend, count_active, count_exchanges, register
+from .native import NATIVE_MAX_SEDES
+from .native import solve as solve_native
+from .presolve import presolve
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "BACKENDS",
+    "NATIVE_MAX_SEDES",
+    "SolverBackend",
+    "count_exchanges",
+    "get_backend",
+    "presolve",
+    "register",
+    "select_backend",
+    "solve",
+    "solve_native",
+]
+
+
+def select_backend(surplus, deficit, backend=None):
+    """
+    Name of the backend to use: the one asked for in the call, then the
+    TRIBUNALES_SOLVER_BACKEND setting, then the best for the instance size:
+    the native DP up to NATIVE_MAX_SEDES active sedes, the heuristic above.
+    The MILP backends rarely close the gap there within the time limit and
+    end with worse plans than the heuristic finds in under a second.
+    """
+    if backend is None:
+        backend = getattr(settings, "TRIBUNALES_SOLVER_BACKEND", "auto")
+    if backend != "auto":
+        return backend
+
+    if count_active(surplus, deficit) <= NATIVE_MAX_SEDES:
+        return "native"
+    return "heuristic"
+
+
+def get_backend(name):
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown solver backend '{name}', choose from {sorted(BACKENDS)}")
+
+
+def solve_subproblem(surplus, deficit, backend=None, time_limit=None, warm_start=None):
+    start = time.perf_counter()
+    incumbent = greedy.solve(surplus, deficit)
+    if warm_start:
+        repaired = greedy.repair(warm_start, surplus, deficit)
+        if count_exchanges(repaired) <= count_exchanges(incumbent):
+            incumbent = repaired
+    bound = greedy.lower_bound(surplus, deficit)
+    if count_exchanges(incumbent) == bound:
+        # The incumbent reaches the lower bound, no backend can do better
+        logger.debug(f"Greedy plan for {len(surplus)}x{len(deficit)} is optimal, {bound} exchanges")
+        return {
+            "move_details": incumbent,
+            "optimal": True,
+            "bound": bound,
+            "backend": "greedy",
+            "build_time": 0.0,
+            "solve_time": time.perf_counter() - start,
+            "n_vars": 0,
+            "n_constraints": 0,
+        }
+
+    name = select_backend(surplus, deficit, backend)
+    logger.debug(f"Solving {len(surplus)}x{len(deficit)} with backend={name}, time_limit={time_limit}")
+    get_backend(name)  # unknown names fail here rather than in a solver process
+    result = pool.solve(name, surplus, deficit, time_limit=time_limit, warm_start=incumbent)
+    move_details = result["move_details"]
+    optimal = result["optimal"]
+    if move_details is None or count_exchanges(move_details) > count_exchanges(incumbent):
+        move_details = incumbent
+        optimal = False
+
+    exchanges = count_exchanges(move_details)
+    # Backends without an optimality proof may still report a better bound
+    bound = max(bound, result.get("bound", bound))
+    if optimal or exchanges == bound:
+        optimal = True
+        bound = exchanges
+    return {
+        "move_details": move_details,
+        "optimal": optimal,
+        "bound": bound,
+        "backend": name,
+        "build_time": result["build_time"],
+        "solve_time": result["solve_time"],
+        "n_vars": result["n_vars"],
+        "n_constraints": result["n_constraints"],
+    }
+
+
+def solve(surplus, deficit, backend=None, time_limit=None, warm_start=None, use_memo=True):
+    """
+    Look the instance up in the plan memo, otherwise presolve it and solve
+    what is left with the selected backend, all within
+    ``time_limit`` seconds (default: the TRIBUNALES_SOLVER_TIME_LIMIT setting,
+    None for no limit). The greedy plan,
+    or ``warm_start`` (a previous plan, repaired to fit these imbalances) if it
+    is better, is handed to the backend as incumbent and kept if the backend
+    does not beat it in time. Sub-problems where that plan already reaches the
+    lower bound skip the backend.
+
+    Returns ``move_details``, whether it is proven ``optimal``, the lower
+    ``bound`` on the number of exchanges, the relative ``gap`` to it, the
+    ``backend`` used ("memo", "presolve" or "greedy" if none was needed),
+    the seconds spent building (``build_time``) and
+    solving (``solve_time``) the models, the number of imbalanced ``sedes``
+    and the size of the models (``n_vars``, ``n_constraints``). Optimal plans
+    are added to the memo.
+    """
+    if use_memo:
+        move_details = memo.get_plan(surplus, deficit)
+        if move_details is not None:
+            exchanges = count_exchanges(move_details)
+            logger.debug(f"Plan found in memo, {exchanges} exchanges")
+            return {
+                "move_details": move_details,
+                "optimal": True,
+                "bound": exchanges,
+                "gap": 0.0,
+                "backend": "memo",
+                "build_time": 0.0,
+                "solve_time": 0.0,
+                "sedes": count_active(surplus, deficit),
+                "n_vars": 0,
+                "n_constraints": 0,
+            }
+
+    if time_limit is None:
+        time_limit = getattr(settings, "TRIBUNALES_SOLVER_TIME_LIMIT", None)
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+
+    move_details, sub_problems = presolve(surplus, deficit)
+    optimal = True
+    bound = count_exchanges(move_details)
+    name = "presolve"
+    build_time = solve_time = 0.0
+    n_vars = n_constraints = 0
+    logger.debug(f"Presolve: {bound} exchanges fixed, {len(sub_problems)} sub-problems left")
+    for sub_surplus, sub_deficit in sub_problems:
+        result = solve_subproblem(
+            sub_surplus,
+            sub_deficit,
+            backend=backend,
+            time_limit=None if deadline is None else max(deadline - time.monotonic(), 0),
+            warm_start=warm_start,
+        )
+        greedy.merge(move_details, result["move_details"])
+        optimal = optimal and result["optimal"]
+        bound += result["bound"]
+        name = result["backend"]
+        build_time += result["build_time"]
+        solve_time += result["solve_time"]
+        n_vars += result["n_vars"]
+        n_constraints += result["n_constraints"]
+
+    exchanges = count_exchanges(move_details)
+    if use_memo and optimal:
+        memo.set_plan(surplus, deficit, move_details)
+    return {
+        "move_details": move_details,
+        "optimal": optimal,
+        "bound": bound,
+        "gap": (exchanges - bound) / exchanges if exchanges else 0.0,
+        "backend": name,
+        "build_time": build_time,
+        "solve_time": solve_time,
+        "sedes": count_active(surplus, deficit),
+        "n_vars": n_vars,
+        "n_constraints": n_constraints,
+    }
@@ -0,0 +1,65 @@
+from django.conf import settings
+
+BACKENDS = {}
+
+# "bigm": the original model, linking moves and exchanges through a global M
+# "tight": per-pair M, lower bound cut on the exchanges and symmetry breaking
+FORMULATIONS = ("bigm", "tight")
+
+
+class SolverBackend:
+    """
+    A solver engine for the minimum-exchanges problem. ``solve`` receives the
+    exams each sending sede has to get rid of (``surplus``) and the room left in
+    each receiving sede (``deficit``) and returns ``move_details``.
+    """
+
+    name = None
+
+    def __init__(self, formulation=None):
+        self.formulation = formulation
+
+    def get_formulation(self):
+        formulation = self.formulation or getattr(settings, "TRIBUNALES_SOLVER_FORMULATION", "tight")
+        if formulation not in FORMULATIONS:
+            raise ValueError(f"Unknown formulation '{formulation}', choose from {FORMULATIONS}")
+        return formulation
+
+    def get_threads(self):
+        return getattr(settings, "TRIBUNALES_SOLVER_THREADS", 1)
+
+    def available(self):
+        return True
+
+    def solve(self, surplus, deficit, time_limit=None, warm_start=None):
+        """
+        Return ``{"move_details": ..., "optimal": ..., "build_time": ...,
+        "solve_time": ..., "n_vars": ..., "n_constraints": ...}``. ``optimal`` is False when ``time_limit`` (seconds)
+        ran out first, in which case ``move_details`` is the best plan found, if
+        any. ``warm_start`` is a feasible plan the backend may start from. The
+        times are the seconds spent building the model and solving it, the
+        counts the size of that model.
+        """
+        raise NotImplementedError
+
+
+def register(backend_class):
+    BACKENDS[backend_class.name] = backend_class()
+    return backend_class
+
+
+def count_active(surplus, deficit):
+    return sum(1 for v in surplus.values() if v > 0) + sum(1 for v in deficit.values() if v > 0)
+
+
+def count_exchanges(move_details):
+    return sum(len(moves) for moves in move_details.values())
+
+
+def symmetric_classes(imbalances):
+    """Sedes with the same non-zero imbalance, interchangeable in any plan."""
+    classes = {}
+    for hq, n in imbalances.items():
+        if n > 0:
+            classes.setdefault(n, []).append(hq)
+    return [hqs for hqs in classes.values() if len(hqs) > 1]
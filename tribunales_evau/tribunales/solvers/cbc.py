@@ -0,0 +1,106 @@
+import logging
+import time
+
+from pulp import LpMinimize, LpProblem, LpVariable, lpSum, value
+from pulp.apis import PULP_CBC_CMD
+from pulp.constants import LpSolutionIntegerFeasible, LpSolutionOptimal
+
+from .base import SolverBackend, register, symmetric_classes
+from .greedy import lower_bound
+
+logger = logging.getLogger(__name__)
+
+M = 10000
+
+
+@register
+class CBCBackend(SolverBackend):
+    name = "cbc"
+
+    def available(self):
+        return PULP_CBC_CMD(msg=False).available()
+
+    def solve(self, surplus, deficit, time_limit=None, warm_start=None):
+        start = time.perf_counter()
+        formulation = self.get_formulation()
+        HQs_from = list(surplus)
+        HQs_to = list(deficit)
+
+        # LP problem
+        prob = LpProblem("Headquarters_Movement", LpMinimize)
+
+        moves = LpVariable.dicts("moves", (HQs_from, HQs_to), lowBound=0, cat="Integer")  # number of moved exams
+        exchanges = LpVariable.dicts("is_moved", (HQs_from, HQs_to), cat="Binary")
+
+        # Objective: Minimize total number of exchanges
+        prob += lpSum(exchanges[i][j] for i in HQs_from for j in HQs_to)
+
+        # Constraints
+        for i in HQs_from:
+            for j in HQs_to:
+                # los que sobran a i, los que le faltan a j
+                upper = max(0, min(surplus[i], max(deficit[j], 0)))
+                prob += exchanges[i][j] <= moves[i][j]
+                if formulation == "tight":
+                    prob += exchanges[i][j] * upper >= moves[i][j]
+                else:
+                    prob += exchanges[i][j] * M >= moves[i][j]  # M is a large number
+                prob += moves[i][j] >= 0
+                prob += moves[i][j] <= upper
+
+        for i in HQs_from:
+            prob += lpSum(moves[i][j] for j in HQs_to) == max(surplus[i], 0)
+
+        # mean is rounded up, so the receiving sedes may end up with spare capacity
+        for j in HQs_to:
+            prob += lpSum(moves[i][j] for i in HQs_from) <= deficit[j]
+
+        if formulation == "tight":
+            prob += lpSum(exchanges[i][j] for i in HQs_from for j in HQs_to) >= lower_bound(surplus, deficit)
+            # Interchangeable sedes are ordered by number of exchanges
+            for hqs in symmetric_classes(surplus):
+                for a, b in zip(hqs, hqs[1:]):
+                    prob += lpSum(exchanges[a][j] for j in HQs_to) >= lpSum(exchanges[b][j] for j in HQs_to)
+            for hqs in symmetric_classes(deficit):
+                for a, b in zip(hqs, hqs[1:]):
+                    prob += lpSum(exchanges[i][a] for i in HQs_from) >= lpSum(exchanges[i][b] for i in HQs_from)
+
+        if warm_start:
+            for i in HQs_from:
+                for j in HQs_to:
+                    n_exams = warm_start.get(i, {}).get(j, 0)
+                    moves[i][j].setInitialValue(n_exams)
+                    exchanges[i][j].setInitialValue(1 if n_exams > 0 else 0)
+
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        prob.solve(
+            PULP_CBC_CMD(
+                msg=False, mip=True, timeLimit=time_limit, warmStart=bool(warm_start), threads=self.get_threads()
+            )
+        )
+        solve_time = time.perf_counter() - start
+        result = {
+            "move_details": None,
+            "optimal": False,
+            "build_time": build_time,
+            "solve_time": solve_time,
+            "n_vars": prob.numVariables(),
+            "n_constraints": prob.numConstraints(),
+        }
+        if prob.sol_status not in (LpSolutionOptimal, LpSolutionIntegerFeasible):
+            return result
+
+        logger.debug(f"CBC objective: {prob.objective.value()}")
+
+        move_details = {}
+        for HQ_from in moves:
+            for HQ_to in moves[HQ_from]:
+                if int(value(moves[HQ_from][HQ_to])) > 0:
+                    if HQ_from not in move_details:
+                        move_details[HQ_from] = {}
+                    move_details[HQ_from][HQ_to] = int(value(moves[HQ_from][HQ_to]))
+
+        result.update(move_details=move_details, optimal=prob.sol_status == LpSolutionOptimal)
+        return result
@@ -0,0 +1,72 @@
+"""
+Fast surplus-to-deficit matching. Used as the incumbent for the exact
+backends and as the answer when their time budget runs out.
+"""
+
+
+def merge(move_details, extra):
+    for HQ_from, moves in extra.items():
+        for HQ_to, n_exams in moves.items():
+            move_details.setdefault(HQ_from, {})
+            move_details[HQ_from][HQ_to] = move_details[HQ_from].get(HQ_to, 0) + n_exams
+    return move_details
+
+
+def solve(surplus, deficit):
+    room = {hq: n for hq, n in deficit.items() if n > 0}
+    move_details = {}
+    for HQ_from in sorted((hq for hq in surplus if surplus[hq] > 0), key=surplus.get, reverse=True):
+        left = surplus[HQ_from]
+        while left > 0:
+            # Smallest sede that can take everything left, otherwise the largest one
+            fits = [hq for hq in room if room[hq] >= left]
+            HQ_to = min(fits, key=room.get) if fits else max(room, key=room.get)
+            n_exams = min(left, room[HQ_to])
+            move_details.setdefault(HQ_from, {})[HQ_to] = n_exams
+            left -= n_exams
+            room[HQ_to] -= n_exams
+            if room[HQ_to] == 0:
+                del room[HQ_to]
+    return move_details
+
+
+def repair(move_details, surplus, deficit):
+    """
+    Turn a plan computed for other imbalances (e.g. before an Examen was
+    corrected) into a feasible plan for these ones, reusing its transfers.
+    """
+    left = {hq: n for hq, n in surplus.items() if n > 0}
+    room = {hq: n for hq, n in deficit.items() if n > 0}
+    plan = {}
+    # Keep the old transfers as far as the new imbalances allow
+    for HQ_from, moves in move_details.items():
+        for HQ_to, n_exams in moves.items():
+            n_exams = min(n_exams, left.get(HQ_from, 0), room.get(HQ_to, 0))
+            if n_exams > 0:
+                plan.setdefault(HQ_from, {})[HQ_to] = n_exams
+                left[HQ_from] -= n_exams
+                room[HQ_to] -= n_exams
+    # Grow the kept transfers before opening new ones
+    for HQ_from, moves in plan.items():
+        for HQ_to in moves:
+            n_exams = min(left[HQ_from], room[HQ_to])
+            moves[HQ_to] += n_exams
+            left[HQ_from] -= n_exams
+            room[HQ_to] -= n_exams
+    return merge(plan, solve(left, room))
+
+
+def lower_bound(surplus, deficit):
+    """
+    Every sending sede needs a transfer of its own, and the surplus needs at
+    least as many receiving sedes as it takes to hold it.
+    """
+    n_from = sum(1 for n in surplus.values() if n > 0)
+    left = sum(n for n in surplus.values() if n > 0)
+    n_to = 0
+    for n in sorted(deficit.values(), reverse=True):
+        if left <= 0:
+            break
+        left -= n
+        n_to += 1
+    return max(n_from, n_to)
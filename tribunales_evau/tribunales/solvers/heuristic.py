@@ -0,0 +1,198 @@
+"""
+Plans for instances too big for the exact backends. A transportation LP
+with the fixed charge of each exchange spread over its exams (slope
+scaling) gives a lower bound and starting plans with few transfers. A large
+neighbourhood search then re-splits the sedes of a few trading groups at a
+time with the exact DP of the native engine, merging and splitting their
+transfers whenever that yields more groups, i.e. fewer exchanges.
+"""
+import itertools
+import logging
+import math
+import time
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+
+from . import greedy
+from .base import SolverBackend, count_exchanges, register
+from .native import group_moves, partition_groups
+
+logger = logging.getLogger(__name__)
+
+SLOPE_SCALING_ROUNDS = 10
+# Neighbourhoods of the local search: this many groups, with at most this many sedes
+LNS_GROUPS = 3
+LNS_MAX_SEDES = 12
+
+
+class TransportationLP:
+    """``moves`` between every pair that can carry exams, without the exchanges."""
+
+    def __init__(self, surplus, deficit):
+        HQs_from = [hq for hq, n in surplus.items() if n > 0]
+        HQs_to = [hq for hq, n in deficit.items() if n > 0]
+        self.pair_from = [i for i in range(len(HQs_from)) for _ in HQs_to]
+        self.pair_to = [j for _ in HQs_from for j in range(len(HQs_to))]
+        self.upper = np.array(
+            [min(surplus[HQs_from[i]], deficit[HQs_to[j]]) for i, j in zip(self.pair_from, self.pair_to)], dtype=float
+        )
+        n_pairs = len(self.upper)
+        ones = np.ones(n_pairs)
+        self.A_eq = coo_matrix((ones, (self.pair_from, range(n_pairs))), shape=(len(HQs_from), n_pairs)).tocsr()
+        self.b_eq = np.array([surplus[hq] for hq in HQs_from], dtype=float)
+        self.A_ub = coo_matrix((ones, (self.pair_to, range(n_pairs))), shape=(len(HQs_to), n_pairs)).tocsr()
+        self.b_ub = np.array([deficit[hq] for hq in HQs_to], dtype=float)
+        self.HQs_from = HQs_from
+        self.HQs_to = HQs_to
+
+    @property
+    def n_vars(self):
+        return len(self.upper)
+
+    @property
+    def n_constraints(self):
+        return len(self.b_eq) + len(self.b_ub)
+
+    def solve(self, cost, time_limit=None):
+        options = {} if time_limit is None else {"time_limit": time_limit}
+        # The dual simplex ends on a vertex, integral for a transportation problem
+        res = linprog(
+            cost,
+            A_ub=self.A_ub,
+            b_ub=self.b_ub,
+            A_eq=self.A_eq,
+            b_eq=self.b_eq,
+            bounds=np.column_stack([np.zeros(self.n_vars), self.upper]),
+            method="highs-ds",
+            options=options,
+        )
+        return res.x if res.status == 0 else None
+
+    def move_details(self, x):
+        move_details = {}
+        for k in np.flatnonzero(np.rint(x) > 0):
+            HQ_from = self.HQs_from[self.pair_from[k]]
+            move_details.setdefault(HQ_from, {})[self.HQs_to[self.pair_to[k]]] = int(round(x[k]))
+        return move_details
+
+
+def trading_groups(move_details, net):
+    """Sedes connected by the transfers of the plan, unused receivers alone."""
+    parent = {hq: hq for hq in net}
+
+    def find(hq):
+        while parent[hq] != hq:
+            parent[hq] = parent[parent[hq]]
+            hq = parent[hq]
+        return hq
+
+    for HQ_from, moves in move_details.items():
+        for HQ_to in moves:
+            parent[find(HQ_from)] = find(HQ_to)
+    groups = {}
+    for hq in net:
+        groups.setdefault(find(hq), []).append(hq)
+    return list(groups.values())
+
+
+def improve_groups(groups, net, deadline=None):
+    """
+    Replace up to LNS_GROUPS groups, LNS_MAX_SEDES sedes at most, by the best
+    split of their sedes whenever it has more groups. Neighbourhoods of one
+    group are tried first, then of two, and so on; only those with a group
+    changed since are tried again. Stops at the ``time.monotonic()`` deadline.
+    """
+    groups = {tuple(group) for group in groups}
+    # Neighbourhoods that did not improve, they never will while their groups stay
+    tried = set()
+    for size in range(1, LNS_GROUPS + 1):
+        # Sorted so that the result does not depend on the hash seed
+        pending = sorted(groups, key=lambda group: (len(group), group))
+        while pending:
+            if deadline is not None and time.monotonic() > deadline:
+                return list(groups)
+            group = pending.pop()
+            if group not in groups:
+                continue
+            others = sorted(groups - {group}, key=lambda group: (len(group), group))
+            for neighbourhood in (
+                (group,) + extra for n_extra in range(size) for extra in itertools.combinations(others, n_extra)
+            ):
+                nodes = [hq for part in neighbourhood for hq in part]
+                # Every group needs a receiving sede, so it takes more receivers than groups to gain one
+                if len(nodes) > LNS_MAX_SEDES or sum(net[hq] < 0 for hq in nodes) <= len(neighbourhood):
+                    continue
+                key = frozenset(neighbourhood)
+                if key in tried:
+                    continue
+                tried.add(key)
+                parts = partition_groups([net[hq] for hq in nodes], deadline=deadline)
+                if parts is None:
+                    return list(groups)
+                if len(parts) > len(neighbourhood):
+                    new_groups = [tuple(nodes[i] for i in part) for part in parts]
+                    groups.difference_update(neighbourhood)
+                    groups.update(new_groups)
+                    pending.extend(new_groups)
+                    break
+    return list(groups)
+
+
+@register
+class HeuristicBackend(SolverBackend):
+    """Plans for hundreds of sedes in seconds, proven optimal only if they reach the bound."""
+
+    name = "heuristic"
+
+    def solve(self, surplus, deficit, time_limit=None, warm_start=None):
+        start = time.perf_counter()
+        deadline = None if time_limit is None else time.monotonic() + time_limit
+        lp = TransportationLP(surplus, deficit)
+        build_time = time.perf_counter() - start
+        if lp.n_vars == 0:
+            return {
+                "move_details": {},
+                "optimal": True,
+                "build_time": build_time,
+                "solve_time": 0.0,
+                "n_vars": 0,
+                "n_constraints": 0,
+            }
+
+        start = time.perf_counter()
+        net = {hq: n for hq, n in surplus.items() if n > 0}
+        net.update({hq: -n for hq, n in deficit.items() if n > 0})
+        incumbent = warm_start or greedy.solve(surplus, deficit)
+        bound = greedy.lower_bound(surplus, deficit)
+        # Each exchange costs 1, spread over the exams it carries
+        cost = 1 / lp.upper
+        for iteration in range(SLOPE_SCALING_ROUNDS):
+            x = lp.solve(cost, time_limit=None if deadline is None else max(deadline - time.monotonic(), 0))
+            if x is None:
+                break
+            if iteration == 0:
+                # moves / upper <= exchanges, so the LP optimum bounds the number of exchanges
+                bound = max(bound, math.ceil(cost @ x - 1e-6))
+            plan = lp.move_details(x)
+            if count_exchanges(plan) < count_exchanges(incumbent):
+                incumbent = plan
+            cost = np.where(x > 0.5, 1 / np.maximum(x, 1), cost)
+
+        groups = improve_groups(trading_groups(incumbent, net), net, deadline=deadline)
+        move_details = group_moves(groups, net)
+        if count_exchanges(move_details) > count_exchanges(incumbent):
+            move_details = incumbent
+        solve_time = time.perf_counter() - start
+        logger.debug(f"heuristic solve: {len(net)} sedes, {count_exchanges(move_details)} exchanges, bound {bound}")
+
+        return {
+            "move_details": move_details,
+            "optimal": count_exchanges(move_details) == bound,
+            "bound": bound,
+            "build_time": build_time,
+            "solve_time": solve_time,
+            "n_vars": lp.n_vars,
+            "n_constraints": lp.n_constraints,
+        }
@@ -0,0 +1,62 @@
+import time
+
+from scipy.optimize import Bounds, LinearConstraint
+
+try:
+    from scipy.optimize import milp
+except ImportError:  # scipy < 1.9
+    milp = None
+
+from .base import SolverBackend, register
+from .matrix import MatrixModel
+
+
+@register
+class HiGHSBackend(SolverBackend):
+    """Sparse matrix model solved in-process by HiGHS through scipy."""
+
+    name = "highs"
+
+    def available(self):
+        return milp is not None
+
+    def solve(self, surplus, deficit, time_limit=None, warm_start=None):
+        start = time.perf_counter()
+        model = MatrixModel(surplus, deficit, formulation=self.get_formulation())
+        build_time = time.perf_counter() - start
+        if model.n_vars == 0:
+            return {
+                "move_details": {},
+                "optimal": True,
+                "build_time": build_time,
+                "solve_time": 0.0,
+                "n_vars": 0,
+                "n_constraints": 0,
+            }
+
+        # scipy does not take a MIP start, the caller keeps warm_start if nothing better turns up
+        options = {} if time_limit is None else {"time_limit": time_limit}
+        start = time.perf_counter()
+        res = milp(
+            model.cost,
+            constraints=LinearConstraint(model.A, model.row_lower, model.row_upper),
+            integrality=model.integrality,
+            bounds=Bounds(model.col_lower, model.col_upper),
+            options=options,
+        )
+        solve_time = time.perf_counter() - start
+
+        result = {
+            "move_details": None,
+            "optimal": False,
+            "build_time": build_time,
+            "solve_time": solve_time,
+            "n_vars": model.n_vars,
+            "n_constraints": model.n_constraints,
+        }
+        if res.x is None:
+            if res.status != 1:  # 1: time limit reached without a solution
+                raise RuntimeError(f"HiGHS failed: {res.message}")
+            return result
+        result.update(move_details=model.move_details(res.x), optimal=res.status == 0, node_count=res.mip_node_count)
+        return result
@@ -0,0 +1,97 @@
+"""
+Sparse matrix form of the minimum-exchanges MILP, built straight from the
+imbalances with numpy so it can be handed to a solver without going through
+PuLP expressions.
+
+Variables are ``moves[p]`` followed by ``exchanges[p]`` for every pair ``p``
+of a sending and a receiving sede that can actually carry exams.
+"""
+import numpy as np
+from scipy import sparse
+
+from .base import symmetric_classes
+from .greedy import lower_bound
+
+M = 10000
+
+
+class MatrixModel:
+    def __init__(self, surplus, deficit, formulation="tight"):
+        self.HQs_from = [hq for hq in surplus if surplus[hq] > 0]
+        self.HQs_to = [hq for hq in deficit if deficit[hq] > 0]
+        supply = np.array([surplus[hq] for hq in self.HQs_from], dtype=float)
+        room = np.array([deficit[hq] for hq in self.HQs_to], dtype=float)
+
+        upper = np.minimum.outer(supply, room)
+        self.pair_from, self.pair_to = np.nonzero(upper > 0)
+        n_pairs = len(self.pair_from)
+        pair = np.arange(n_pairs)
+        moves, exchanges = pair, n_pairs + pair
+
+        # exchanges <= moves, moves <= M * exchanges
+        pair_upper = upper[self.pair_from, self.pair_to]
+        big_m = pair_upper if formulation == "tight" else np.full(n_pairs, M)
+        rows = [pair, pair, n_pairs + pair, n_pairs + pair]
+        cols = [moves, exchanges, moves, exchanges]
+        data = [np.ones(n_pairs), -np.ones(n_pairs), np.ones(n_pairs), -big_m]
+        lower = [np.zeros(n_pairs), np.full(n_pairs, -np.inf)]
+        upper_rows = [np.full(n_pairs, np.inf), np.zeros(n_pairs)]
+        # every surplus is sent, no sede receives more than it can take
+        rows += [2 * n_pairs + self.pair_from, 2 * n_pairs + len(supply) + self.pair_to]
+        cols += [moves, moves]
+        data += [np.ones(n_pairs), np.ones(n_pairs)]
+        lower += [supply, np.zeros(len(room))]
+        upper_rows += [supply, room]
+        n_rows = 2 * n_pairs + len(supply) + len(room)
+
+        if formulation == "tight":
+            # sum(exchanges) >= lower bound
+            rows.append(np.full(n_pairs, n_rows))
+            cols.append(exchanges)
+            data.append(np.ones(n_pairs))
+            lower.append([lower_bound(surplus, deficit)])
+            upper_rows.append([np.inf])
+            n_rows += 1
+            # Interchangeable sedes are ordered by number of exchanges
+            for side, HQs, imbalances in (
+                (self.pair_from, self.HQs_from, surplus),
+                (self.pair_to, self.HQs_to, deficit),
+            ):
+                position = {hq: k for k, hq in enumerate(HQs)}
+                for hqs in symmetric_classes({hq: imbalances[hq] for hq in HQs}):
+                    for a, b in zip(hqs, hqs[1:]):
+                        in_a = exchanges[side == position[a]]
+                        in_b = exchanges[side == position[b]]
+                        rows.append(np.full(len(in_a) + len(in_b), n_rows))
+                        cols.append(np.concatenate((in_a, in_b)))
+                        data.append(np.concatenate((np.ones(len(in_a)), -np.ones(len(in_b)))))
+                        lower.append([0])
+                        upper_rows.append([np.inf])
+                        n_rows += 1
+
+        self.A = sparse.coo_array(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape=(n_rows, 2 * n_pairs)
+        ).tocsr()
+        self.row_lower = np.concatenate(lower)
+        self.row_upper = np.concatenate(upper_rows)
+
+        self.cost = np.concatenate((np.zeros(n_pairs), np.ones(n_pairs)))
+        self.col_lower = np.zeros(2 * n_pairs)
+        self.col_upper = np.concatenate((pair_upper, np.ones(n_pairs)))
+        self.integrality = np.ones(2 * n_pairs)
+
+    @property
+    def n_vars(self):
+        return self.A.shape[1]
+
+    @property
+    def n_constraints(self):
+        return self.A.shape[0]
+
+    def move_details(self, x):
+        moves = np.rint(x[: len(self.pair_from)]).astype(int)
+        move_details = {}
+        for a, b, n_exams in zip(self.pair_from, self.pair_to, moves):
+            if n_exams > 0:
+                move_details.setdefault(self.HQs_from[a], {})[self.HQs_to[b]] = int(n_exams)
+        return move_details
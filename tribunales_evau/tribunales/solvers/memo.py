@@ -0,0 +1,54 @@
+"""
+Plans memoized by the content of the instance rather than by subject and
+date. Two instances with the same surplus and deficit values have the same
+optimal plans up to renaming the sedes, so a plan is stored with sede
+positions in a canonical order and mapped back to sede ids on read.
+
+There is one entry per distinct instance, so they live in the "memo" cache
+when there is one, culled among themselves rather than pushing the subject
+plans out of the default cache, and expire after MEMO_TIMEOUT anyway.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+MEMO_PREFIX = "plan_"
+MEMO_CACHE = "memo"
+# Seconds a memoized plan is kept
+MEMO_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def get_cache():
+    return caches[MEMO_CACHE] if MEMO_CACHE in settings.CACHES else cache
+
+
+def _canonical(surplus, deficit):
+    senders = sorted((n, hq) for hq, n in surplus.items() if n > 0)
+    receivers = sorted((n, hq) for hq, n in deficit.items() if n > 0)
+    values = ",".join(str(n) for n, _ in senders) + "|" + ",".join(str(n) for n, _ in receivers)
+    key = MEMO_PREFIX + hashlib.sha1(values.encode()).hexdigest()
+    return key, [hq for _, hq in senders], [hq for _, hq in receivers]
+
+
+def get_plan(surplus, deficit):
+    key, HQs_from, HQs_to = _canonical(surplus, deficit)
+    moves = get_cache().get(key)
+    if moves is None:
+        return None
+    move_details = {}
+    for a, b, n_exams in moves:
+        move_details.setdefault(HQs_from[a], {})[HQs_to[b]] = n_exams
+    return move_details
+
+
+def set_plan(surplus, deficit, move_details):
+    key, HQs_from, HQs_to = _canonical(surplus, deficit)
+    position_from = {hq: a for a, hq in enumerate(HQs_from)}
+    position_to = {hq: b for b, hq in enumerate(HQs_to)}
+    moves = [
+        [position_from[HQ_from], position_to[HQ_to], n_exams]
+        for HQ_from, row in move_details.items()
+        for HQ_to, n_exams in row.items()
+    ]
+    get_cache().set(key, moves, timeout=MEMO_TIMEOUT)
@@ -0,0 +1,147 @@
+"""
+Exact combinatorial engine for the minimum-exchanges problem.
+
+Every sede with a non-zero imbalance is a node with net ``surplus`` (positive)
+or ``-deficit`` (negative). Any optimal plan splits the nodes into groups that
+only trade among themselves, and a group of ``g`` sedes can always be served
+with ``g - 1`` transfers as long as its net is not positive (the deficit sedes
+may be left partially filled because ``mean`` is rounded up). The minimum
+number of exchanges is therefore the number of active sedes minus the largest
+number of such disjoint groups, which is found with a subset DP over bitmasks.
+"""
+import logging
+import time
+
+import numpy as np
+
+from .base import SolverBackend, register
+
+logger = logging.getLogger(__name__)
+
+# Above this number of active sedes the 2^n tables get too big, automatic selection uses the heuristic backend
+NATIVE_MAX_SEDES = 18
+
+NEG = np.iinfo(np.int64).min
+
+
+def _subset_sums(net):
+    sums = np.zeros(1 << len(net), dtype=np.int64)
+    for i, v in enumerate(net):
+        bit = 1 << i
+        sums[bit : 2 * bit] = sums[:bit] + v
+    return sums
+
+
+def _submasks(mask, n):
+    subs = np.zeros(1, dtype=np.int64)
+    for i in range(n):
+        if mask >> i & 1:
+            subs = np.concatenate((subs, subs | (1 << i)))
+    return subs
+
+
+def partition_groups(net, deadline=None):
+    """
+    Split the node indices of ``net`` into the largest number of groups whose
+    net sum is <= 0. ``sum(net)`` must be <= 0. Returns None if the
+    ``time.monotonic()`` deadline is reached first.
+    """
+    n = len(net)
+    if n == 0:
+        return []
+    full = (1 << n) - 1
+    sums = _subset_sums(net)
+
+    # seeds[k][m]: the nodes in m can be split into exactly k groups with net <= 0
+    seed = np.zeros(1 << n, dtype=bool)
+    seed[0] = True
+    seeds = [seed]
+    while True:
+        # best[m]: largest sum of a seed contained in m
+        best = np.where(seed, sums, NEG)
+        for i in range(n):
+            view = best.reshape(-1, 2, 1 << i)
+            np.maximum(view[:, 1, :], view[:, 0, :], out=view[:, 1, :])
+        # close a new, non-empty group: some m1 strictly inside m with sums[m1] >= sums[m]
+        reach = np.full(1 << n, NEG, dtype=np.int64)
+        for i in range(n):
+            view = reach.reshape(-1, 2, 1 << i)
+            np.maximum(view[:, 1, :], best.reshape(-1, 2, 1 << i)[:, 0, :], out=view[:, 1, :])
+        seed = reach >= sums
+        # Merging two groups keeps them valid, so once full is unreachable it stays so
+        if not seed[full]:
+            break
+        seeds.append(seed)
+        if deadline is not None and time.monotonic() > deadline:
+            return None
+
+    groups = []
+    mask = full
+    for k in range(len(seeds) - 1, 0, -1):
+        subs = _submasks(mask, n)
+        subs = subs[(subs != mask) & seeds[k - 1][subs] & (sums[subs] >= sums[mask])]
+        prev = int(subs[0])
+        groups.append([i for i in range(n) if (mask ^ prev) >> i & 1])
+        mask = prev
+    groups.reverse()
+    return groups
+
+
+def group_moves(groups, net):
+    """
+    Plan where the sedes of each group only trade among themselves. ``net``
+    maps every sede to its surplus (positive) or -deficit (negative).
+    """
+    move_details = {}
+    for group in groups:
+        # North-west corner rule inside the group: at most len(group) - 1 transfers
+        senders = [[hq, net[hq]] for hq in group if net[hq] > 0]
+        receivers = [[hq, -net[hq]] for hq in group if net[hq] < 0]
+        j = 0
+        for HQ_from, left in senders:
+            while left > 0:
+                HQ_to, room = receivers[j]
+                n_exams = min(left, room)
+                move_details.setdefault(HQ_from, {})[HQ_to] = n_exams
+                left -= n_exams
+                receivers[j][1] -= n_exams
+                if receivers[j][1] == 0:
+                    j += 1
+    return move_details
+
+
+def solve(surplus, deficit, time_limit=None):
+    """
+    Minimum-exchanges plan sending every ``surplus[hq]`` exams to sedes that can
+    take up to ``deficit[hq]`` more. Returns ``move_details`` as built by
+    ``problem_solve``: ``{from_hq: {to_hq: n_exams}}``, or None if it takes
+    longer than ``time_limit`` seconds.
+    """
+    nodes = [hq for hq in surplus if surplus[hq] > 0] + [hq for hq in deficit if deficit[hq] > 0]
+    net = [surplus[hq] if hq in surplus else -deficit[hq] for hq in nodes]
+    if sum(net) > 0:
+        raise ValueError("Total surplus exceeds the available capacity")
+
+    groups = partition_groups(net, deadline=None if time_limit is None else time.monotonic() + time_limit)
+    if groups is None:
+        return None
+
+    move_details = group_moves([[nodes[i] for i in group] for group in groups], dict(zip(nodes, net)))
+
+    logger.debug(f"native solve: {len(nodes)} sedes, {sum(len(v) for v in move_details.values())} exchanges")
+    return move_details
+
+
+@register
+class NativeBackend(SolverBackend):
+    name = "native"
+
+    def solve(self, surplus, deficit, time_limit=None, warm_start=None):
+        start = time.perf_counter()
+        move_details = solve(surplus, deficit, time_limit=time_limit)
+        # No model is built, the search runs over subsets of sedes
+        result = {"move_details": move_details, "optimal": True, "build_time": 0.0, "n_vars": 0, "n_constraints": 0}
+        if move_details is None:
+            result.update(move_details=warm_start, optimal=False)
+        result["solve_time"] = time.perf_counter() - start
+        return result
@@ -0,0 +1,160 @@
+"""
+Long-lived solver processes. Each worker imports the solver libraries once
+and then serves solves sent over a pipe, so a background solve does not run
+in (nor hold the GIL of) the web process. A worker retires after
+TRIBUNALES_SOLVER_MAX_SOLVES solves or once its peak memory has grown
+TRIBUNALES_SOLVER_MAX_MEMORY MB over what it started with, and a fresh one
+takes its place.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import resource
+import threading
+
+from django.conf import settings
+
+from ..governor import SolverBusy
+from .base import BACKENDS
+
+logger = logging.getLogger(__name__)
+
+# Seconds on top of the time limit before a solver process is given up on
+TIMEOUT_MARGIN = 10
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _peak_memory():
+    # ru_maxrss is in kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _serve(conn, max_solves, max_memory):
+    baseline = _peak_memory()
+    n_solves = 0
+    while True:
+        try:
+            name, surplus, deficit, time_limit, warm_start = conn.recv()
+        except EOFError:
+            return
+        n_solves += 1
+        try:
+            result = BACKENDS[name].solve(surplus, deficit, time_limit=time_limit, warm_start=warm_start)
+        except Exception as e:
+            result = e
+        retire = n_solves >= max_solves or _peak_memory() - baseline > max_memory
+        conn.send((result, retire))
+        if retire:
+            conn.close()
+            return
+
+
+class SolverPool:
+    def __init__(self, processes, max_solves=100, max_memory=500):
+        # spawn: forking a web process with running threads is not safe
+        self.context = multiprocessing.get_context("spawn")
+        self.max_solves = max_solves
+        self.max_memory = max_memory
+        self.idle = queue.Queue()
+        self.workers = set()
+        # A pool inherited through fork belongs to the parent, see get_pool
+        self.pid = os.getpid()
+        for _ in range(processes):
+            self.idle.put(self._start())
+
+    def _start(self):
+        conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=_serve,
+            args=(child_conn, self.max_solves, self.max_memory),
+            name="tribunales-solver",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = (process, conn)
+        self.workers.add(worker)
+        return worker
+
+    def _stop(self, worker, kill=False):
+        process, conn = worker
+        self.workers.discard(worker)
+        conn.close()
+        if kill:
+            process.kill()
+        process.join(timeout=5)
+        if process.is_alive():
+            process.kill()
+
+    def solve(self, name, surplus, deficit, time_limit=None, warm_start=None):
+        """
+        ``BACKENDS[name].solve(...)`` in the first idle worker. With a time
+        limit, raises SolverBusy if no worker frees up within it and
+        RuntimeError if the worker does not answer within it, plus
+        TIMEOUT_MARGIN; that worker is killed and replaced.
+        """
+        timeout = None if time_limit is None else time_limit + TIMEOUT_MARGIN
+        try:
+            worker = self.idle.get(timeout=timeout)
+        except queue.Empty:
+            raise SolverBusy("Todos los procesos de cálculo están ocupados, se reintentará en unos segundos")
+        process, conn = worker
+        try:
+            conn.send((name, surplus, deficit, time_limit, warm_start))
+            if not conn.poll(timeout):
+                self._stop(worker, kill=True)
+                self.idle.put(self._start())
+                raise RuntimeError(f"Solver process {process.pid} did not answer in {timeout}s, replaced")
+            result, retire = conn.recv()
+        except (EOFError, OSError):
+            self._stop(worker)
+            self.idle.put(self._start())
+            raise RuntimeError(f"Solver process {process.pid} died (exit code {process.exitcode})")
+
+        if retire:
+            logger.debug(f"Recycling solver process {process.pid}")
+            self._stop(worker)
+            worker = self._start()
+        self.idle.put(worker)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        for worker in list(self.workers):
+            self._stop(worker)
+
+
+def get_pool():
+    """
+    The solver processes of this process, started by config/wsgi.py and
+    config/asgi.py in the serving processes or else on first use, or None if
+    TRIBUNALES_SOLVER_PROCESSES is 0 or this is itself a child process (a
+    solver or a warm_moves worker).
+    """
+    global _pool
+    processes = getattr(settings, "TRIBUNALES_SOLVER_PROCESSES", 0)
+    if not processes or multiprocessing.parent_process() is not None:
+        return None
+    with _pool_lock:
+        # A web server that forks after loading the app (gunicorn --preload) leaves each worker the parent's pool
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = SolverPool(
+                processes,
+                max_solves=settings.TRIBUNALES_SOLVER_MAX_SOLVES,
+                max_memory=settings.TRIBUNALES_SOLVER_MAX_MEMORY,
+            )
+            atexit.register(_pool.close)
+    return _pool
+
+
+def solve(name, surplus, deficit, time_limit=None, warm_start=None):
+    """Solve with backend ``name`` in a solver process, or right here if there are none."""
+    pool = get_pool()
+    if pool is None:
+        return BACKENDS[name].solve(surplus, deficit, time_limit=time_limit, warm_start=warm_start)
+    return pool.solve(name, surplus, deficit, time_limit=time_limit, warm_start=warm_start)
@@ -0,0 +1,39 @@
+"""
+Reductions applied before any backend sees the instance. All of them keep the
+optimal number of exchanges.
+"""
+
+
+def match_pairs(surplus, deficit):
+    """
+    Send each surplus to a sede missing exactly that many exams. A pair whose
+    imbalances cancel out can always be served on its own in an optimal plan.
+    """
+    by_size = {}
+    for hq, n in deficit.items():
+        by_size.setdefault(n, []).append(hq)
+    move_details = {}
+    for hq, n in surplus.items():
+        if by_size.get(n):
+            move_details[hq] = {by_size[n].pop(0): n}
+    return move_details
+
+
+def presolve(surplus, deficit):
+    """
+    Drop the balanced sedes and match the exact surplus/deficit pairs.
+    Returns the fixed transfers and the list of (surplus, deficit)
+    sub-problems left, one at most: no further split is safe, every sender
+    can reach every receiver and the best grouping of the rest is what the
+    backends solve for.
+    """
+    surplus = {hq: n for hq, n in surplus.items() if n > 0}
+    deficit = {hq: n for hq, n in deficit.items() if n > 0}
+
+    fixed = match_pairs(surplus, deficit)
+    for HQ_from, moves in fixed.items():
+        del surplus[HQ_from]
+        for HQ_to in moves:
+            del deficit[HQ_to]
+
+    return fixed, [(surplus, deficit)] if surplus else []
@@ -0,0 +1,51 @@
+import logging
+
+from . import governor
+from .views import compute_moves, get_hqs, get_last_move_details
+
+logger = logging.getLogger(__name__)
+
+
+def apply_perturbation(headquarter_data, perturbation):
+    """
+    Copy of ``headquarter_data`` with the changes in ``perturbation``:
+    ``{cod_sede: {"exams": delta, "evals": delta}}``, clipped at 0.
+    """
+    data = {hq: dict(values) for hq, values in headquarter_data.items()}
+    for hq, delta in perturbation.items():
+        values = data.setdefault(str(hq), {"exams": 0, "evals": 0})
+        for field in ("exams", "evals"):
+            values[field] = max(values[field] + delta.get(field, 0), 0)
+    return data
+
+
+def sweep_moves(asignatura, fecha, perturbations, backend=None, time_limit=None):
+    """
+    Plan of every what-if in ``perturbations`` (see ``apply_perturbation``)
+    applied to the Examen and Evaluador rows of ``asignatura`` and ``fecha``,
+    which are read once. Each solve starts from the last plan computed for
+    them, identical instances are solved once and the sub-problems they
+    share with earlier solves come from the plan memo. Nothing is written to
+    the moves cache. Each solve takes a solve slot, SolverBusy is raised if
+    the queue is full.
+    """
+    headquarter_data = get_hqs(asignatura, fecha)
+    warm_start = get_last_move_details(asignatura.COD_ASIGNATURA, fecha)
+
+    solved = {}
+    results = []
+    for perturbation in perturbations:
+        data = apply_perturbation(headquarter_data, perturbation)
+        key = tuple(sorted((hq, values["exams"], values["evals"]) for hq, values in data.items()))
+        if key not in solved:
+            with governor.solve_slot():
+                solved[key], _ = compute_moves(
+                    data,
+                    backend=backend,
+                    time_limit=time_limit,
+                    warm_start=warm_start,
+                    label=f"{asignatura} ({fecha}) + {perturbation}",
+                )
+        results.append(solved[key])
+    logger.debug(f"Swept {len(perturbations)} perturbations of {asignatura} ({fecha}), {len(solved)} solves")
+    return results
@@ -1,10 +1,82 @@
+import importlib
+import json
 import os
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django.conf import settings
-from django.test import TestCase
-from tribunales.models import Asignatura, Evaluador, Examen, Sede
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
 
-from .views import get_moves
+# The module call_command runs, which is imported under the app's name
+from tribunales.management.commands import warm_moves
+from tribunales.models import (
+    SEDE_DIRECTORY_MAX_AGE,
+    SEDE_DIRECTORY_VERSION_KEY,
+    Asignatura,
+    Evaluador,
+    Examen,
+    Sede,
+    SolveRecord,
+    get_sede_names,
+    get_sede_names_for,
+    last_moves_cache_key,
+    moves_cache_key,
+)
+
+from tribunales_evau.users.tests.factories import UserFactory
+
+from . import governor, jobs
+from .admin import SOLVE_STATS_DAYS
+from .benchmark import generate_instance, run_benchmark
+from .differential import check_plan, get_engines, run_check
+from .dzn import asignatura_name, format_dzn, parse_dzn
+from .solvers import BACKENDS, count_exchanges, greedy, memo, pool, presolve, select_backend, solve, solve_native
+from .solvers.cbc import CBCBackend
+from .solvers.heuristic import improve_groups, trading_groups
+from .solvers.highs import HiGHSBackend
+from .solvers.matrix import MatrixModel
+from .solvers.pool import SolverPool
+from .sweeps import apply_perturbation, sweep_moves
+from .views import get_catalog, get_hqs, get_imbalances, get_moves, load_hqs, parse_time_limit, split_hqs
+
+
+def create_asignatura(sede_exams=((1, 12), (2, 4), (3, 8)), fechas=("2023-06-08",)):
+    """Asignatura TEST with one evaluador at each sede and its ``(cod_sede, exams)`` exams on each of ``fechas``."""
+    asignatura = Asignatura.objects.create(ASIGNATURA="TEST")
+    for cod_sede, exams in sede_exams:
+        sede = Sede.objects.create(COD_SEDE=cod_sede, UBICACION=f"Sede {cod_sede}")
+        Evaluador.objects.create(COD_SEDE=sede, COD_ASIGNATURA=asignatura, EVALUADORES=1)
+        for fecha in fechas:
+            Examen.objects.create(COD_SEDE=sede, COD_ASIGNATURA=asignatura, EXAMENES=exams, FECHA=fecha)
+    return asignatura
+
+
+class AsignaturaTestCase(TestCase):
+    # The data create_asignatura loads before each test
+    sede_exams = ((1, 12), (2, 4), (3, 8))
+    fecha = "2023-06-08"
+    fechas = (fecha,)
+
+    def setUp(self):
+        self.asignatura = create_asignatura(self.sede_exams, self.fechas)
+        self.job_id = moves_cache_key(self.asignatura.COD_ASIGNATURA, self.fecha)
+
+    def tearDown(self):
+        cache.clear()
 
 
 class MoveTestCase1(TestCase):
@@ -118,3 +190,904 @@ class MoveTestCase2(TestCase):
             # self.assertEqual(moves_data['mean'], expected_mean)
             # self.assertEqual(moves_data['total_moves'], expected_total_moves)
             # self.assertEqual(moves_data['move_details'], expected_move_details)
+
+    def test_backends_agree(self):
+        backends = list(BACKENDS.values()) + [HiGHSBackend(formulation="bigm"), CBCBackend(formulation="bigm")]
+        for asignatura in self.asignaturas:
+            headquarter_data = get_hqs(asignatura, self.fecha)
+            mean, HQs_from, HQs_to = split_hqs(headquarter_data)
+            surplus, deficit = get_imbalances(headquarter_data, mean, HQs_from, HQs_to)
+
+            exchanges = set()
+            for backend in backends:
+                move_details = backend.solve(surplus, deficit)["move_details"]
+                self.assertEqual(check_plan(move_details, surplus, deficit), [])
+                exchanges.add(count_exchanges(move_details))
+            self.assertEqual(len(exchanges), 1)
+
+
+class NativeSolverTestCase(TestCase):
+    def test_zero_sum_groups(self):
+        # {1, 3} and {2, 4} balance each other: 2 exchanges instead of 3
+        surplus = {"1": 5, "2": 7}
+        deficit = {"3": 5, "4": 7}
+        move_details = solve_native(surplus, deficit)
+        self.assertEqual(move_details, {"1": {"3": 5}, "2": {"4": 7}})
+
+    def test_spare_capacity(self):
+        surplus = {"1": 5, "2": 5}
+        deficit = {"3": 6, "4": 6}
+        move_details = solve_native(surplus, deficit)
+        self.assertEqual(check_plan(move_details, surplus, deficit), [])
+        self.assertEqual(count_exchanges(move_details), 2)
+
+    def test_balanced(self):
+        self.assertEqual(solve_native({"1": 0}, {}), {})
+
+    def test_random_instances(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            headquarter_data = {
+                str(i): {"exams": rng.randint(0, 60), "evals": rng.randint(0, 3)} for i in range(rng.randint(2, 8))
+            }
+            headquarter_data["0"]["evals"] += 1
+            mean, HQs_from, HQs_to = split_hqs(headquarter_data)
+            surplus, deficit = get_imbalances(headquarter_data, mean, HQs_from, HQs_to)
+
+            native = solve_native(surplus, deficit)
+            self.assertEqual(check_plan(native, surplus, deficit), [])
+            cbc = BACKENDS["cbc"].solve(surplus, deficit)["move_details"]
+            self.assertEqual(count_exchanges(native), count_exchanges(cbc))
+
+
+class BackendSelectionTestCase(TestCase):
+    surplus = {str(i): 10 for i in range(15)}
+    deficit = {str(i): 10 for i in range(15, 30)}
+
+    def test_auto(self):
+        self.assertEqual(select_backend({"1": 3}, {"2": 5}), "native")
+        # The native DP up to NATIVE_MAX_SEDES active sedes, the heuristic from one more
+        self.assertEqual(select_backend({str(i): 10 for i in range(9)}, {str(i): 10 for i in range(9, 18)}), "native")
+        self.assertEqual(
+            select_backend({str(i): 10 for i in range(9)}, {str(i): 10 for i in range(9, 19)}), "heuristic"
+        )
+        self.assertEqual(select_backend(self.surplus, self.deficit), "heuristic")
+        self.assertEqual(select_backend(self.surplus, {str(i): 10 for i in range(15, 40)}), "heuristic")
+
+    def test_in_process(self):
+        with mock.patch("subprocess.Popen", side_effect=AssertionError("solver subprocess spawned")):
+            # Greedy leaves 15 * 13 exams in 14 receivers of 14 above the lower bound
+            result = solve(
+                {str(i): 13 for i in range(15)}, {str(i): 14 for i in range(15, 29)}, time_limit=1, use_memo=False
+            )
+        self.assertEqual(result["backend"], "heuristic")
+
+    @override_settings(TRIBUNALES_SOLVER_BACKEND="cbc")
+    def test_overrides(self):
+        self.assertEqual(select_backend({"1": 3}, {"2": 5}), "cbc")
+        self.assertEqual(select_backend({"1": 3}, {"2": 5}, backend="highs"), "highs")
+
+    def test_get_moves_backend(self):
+        asignatura = create_asignatura()
+        moves_data = get_moves(asignatura, "2023-06-08", backend="highs")
+        self.assertEqual(moves_data["move_details"], {"1": {"2": 4}})
+        self.assertTrue(moves_data["optimal"])
+
+
+class HeuristicTestCase(TestCase):
+    def random_instance(self, n_senders, n_receivers, seed):
+        rng = random.Random(seed)
+        surplus = {f"s{i}": rng.randint(5, 60) for i in range(n_senders)}
+        deficit = {f"r{j}": rng.randint(5, 60) for j in range(n_receivers)}
+        # 3% spare room in the receiving sedes
+        scale = sum(surplus.values()) * 1.03 / sum(deficit.values())
+        return surplus, {hq: int(n * scale) + 1 for hq, n in deficit.items()}
+
+    def test_improve_groups(self):
+        net = {"1": 3, "2": 3, "3": -3, "4": -4, "5": -1}
+        groups = improve_groups(trading_groups({"1": {"3": 2, "4": 1}, "2": {"4": 3}}, net), net)
+        self.assertEqual(sorted(sorted(group) for group in groups), [["1", "3"], ["2", "4"], ["5"]])
+
+    def test_against_native(self):
+        for seed in range(5):
+            surplus, deficit = self.random_instance(8, 8, seed)
+            result = BACKENDS["heuristic"].solve(surplus, deficit)
+            self.assertEqual(check_plan(result["move_details"], surplus, deficit), [])
+            exchanges = count_exchanges(result["move_details"])
+            self.assertLessEqual(result["bound"], count_exchanges(solve_native(surplus, deficit)))
+            self.assertGreaterEqual(exchanges, count_exchanges(solve_native(surplus, deficit)))
+            self.assertEqual(result["optimal"], exchanges == result["bound"])
+
+    def test_large(self):
+        surplus, deficit = self.random_instance(30, 30, 0)
+        result = solve(surplus, deficit, time_limit=20, use_memo=False)
+        self.assertEqual(result["backend"], "heuristic")
+        self.assertEqual(check_plan(result["move_details"], surplus, deficit), [])
+        self.assertLess(count_exchanges(result["move_details"]), count_exchanges(greedy.solve(surplus, deficit)))
+        self.assertLessEqual(result["bound"], count_exchanges(result["move_details"]))
+
+
+class GreedyShortCircuitTestCase(TestCase):
+    def test_skips_backend(self):
+        with mock.patch.object(BACKENDS["highs"], "solve", side_effect=AssertionError("backend called")):
+            result = solve({"1": 4, "3": 6}, {"4": 5, "6": 7}, backend="highs", use_memo=False)
+        self.assertEqual(result["backend"], "greedy")
+        self.assertEqual(result["move_details"], {"3": {"6": 6}, "1": {"4": 4}})
+        self.assertTrue(result["optimal"])
+
+    def test_calls_backend_above_bound(self):
+        result = solve({"1": 3, "2": 3}, {"3": 2, "4": 2, "5": 2}, backend="highs", use_memo=False)
+        self.assertEqual(result["backend"], "highs")
+        self.assertEqual(result["bound"], 4)
+
+
+class DeadlineTestCase(TestCase):
+    surplus = {"1": 5, "2": 7, "3": 4}
+    deficit = {"4": 5, "5": 7, "6": 2, "7": 3}
+
+    def test_greedy(self):
+        move_details = greedy.solve(self.surplus, self.deficit)
+        self.assertEqual(check_plan(move_details, self.surplus, self.deficit), [])
+        optimum = count_exchanges(solve_native(self.surplus, self.deficit))
+        self.assertLessEqual(greedy.lower_bound(self.surplus, self.deficit), optimum)
+        self.assertGreaterEqual(count_exchanges(move_details), optimum)
+
+    def test_time_limit_keeps_incumbent(self):
+        surplus = {"1": 6, "2": 6}
+        deficit = {"3": 4, "4": 4, "5": 4}
+        result = solve(surplus, deficit, backend="native", time_limit=0, use_memo=False)
+        self.assertEqual(check_plan(result["move_details"], surplus, deficit), [])
+        self.assertEqual(result["move_details"], greedy.solve(surplus, deficit))
+        self.assertFalse(result["optimal"])
+        self.assertGreater(result["gap"], 0)
+
+    def test_solve(self):
+        result = solve(self.surplus, self.deficit)
+        self.assertTrue(result["optimal"])
+        self.assertEqual(result["gap"], 0)
+        self.assertEqual(result["bound"], count_exchanges(result["move_details"]))
+
+
+class PresolveTestCase(TestCase):
+    surplus = {"1": 0, "2": 5, "3": 9, "4": 4}
+    deficit = {"5": 5, "6": 6, "7": 8}
+
+    def test_presolve(self):
+        fixed, sub_problems = presolve(self.surplus, self.deficit)
+        self.assertEqual(fixed, {"2": {"5": 5}})
+        self.assertEqual(sub_problems, [({"3": 9, "4": 4}, {"6": 6, "7": 8})])
+
+    def test_solve(self):
+        result = solve(self.surplus, self.deficit)
+        self.assertEqual(check_plan(result["move_details"], self.surplus, self.deficit), [])
+        self.assertEqual(result["move_details"]["2"], {"5": 5})
+        self.assertEqual(count_exchanges(result["move_details"]), 4)
+        self.assertTrue(result["optimal"])
+
+
+class MatrixModelTestCase(TestCase):
+    def test_only_pairs_that_carry_exams(self):
+        model = MatrixModel({"1": 4, "2": 0, "3": 6}, {"4": 5, "5": 0, "6": 5}, formulation="bigm")
+        # 2 senders x 2 receivers: 4 moves and 4 exchanges, 2 linking rows per pair + 2 + 2
+        self.assertEqual(model.n_vars, 8)
+        self.assertEqual(model.n_constraints, 12)
+        self.assertEqual(list(model.col_upper[:4]), [4, 4, 5, 5])
+
+    def test_tight(self):
+        model = MatrixModel({"1": 4, "3": 6}, {"4": 5, "6": 5}, formulation="tight")
+        # Lower bound cut and one symmetry row for receivers 4 and 6
+        self.assertEqual(model.n_constraints, 14)
+        self.assertEqual(model.A[4, 4], -4)  # moves <= 4 * exchanges for pair (1, 4)
+        self.assertEqual(model.row_lower[12], 2)
+
+    def test_times_reported(self):
+        result = solve({"1": 3, "2": 3}, {"3": 2, "4": 2, "5": 2}, backend="highs", use_memo=False)
+        self.assertGreater(result["build_time"], 0)
+        self.assertGreater(result["solve_time"], 0)
+        self.assertGreater(result["n_vars"], 0)
+
+
+class MemoTestCase(TestCase):
+    def test_shared_across_sede_ids(self):
+        cache.clear()
+        result = solve({"1": 5, "2": 9}, {"3": 6, "4": 8})
+        self.assertNotEqual(result["backend"], "memo")
+
+        # Same values on other sedes, in another order
+        surplus = {"12": 9, "11": 5}
+        deficit = {"14": 8, "13": 6, "15": 0}
+        result = solve(surplus, deficit)
+        self.assertEqual(result["backend"], "memo")
+        self.assertEqual(check_plan(result["move_details"], surplus, deficit), [])
+        self.assertEqual(count_exchanges(result["move_details"]), 3)
+
+        self.assertNotEqual(solve({"1": 5, "2": 9}, {"3": 6, "4": 9})["backend"], "memo")
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "default"},
+            "memo": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "memo"},
+        }
+    )
+    def test_own_cache(self):
+        surplus, deficit = {"1": 5, "2": 9}, {"3": 6, "4": 8}
+        solve(surplus, deficit)
+        # The memo entries stay out of the default cache, where the subject plans live, and expire
+        key = memo._canonical(surplus, deficit)[0]
+        self.assertIsNone(cache.get(key))
+        self.assertIsNotNone(caches["memo"].get(key))
+        with mock.patch("time.time", return_value=time.time() + memo.MEMO_TIMEOUT + 1):
+            self.assertIsNone(caches["memo"].get(key))
+
+
+class WarmStartTestCase(TestCase):
+    def test_repair(self):
+        # Sede 2 now needs 2 exams less and sede 5 needs 3 more
+        previous = {"1": {"2": 5, "3": 2}, "4": {"3": 6}}
+        surplus = {"1": 7, "4": 6}
+        deficit = {"2": 3, "3": 8, "5": 3}
+        move_details = greedy.repair(previous, surplus, deficit)
+        self.assertEqual(check_plan(move_details, surplus, deficit), [])
+        self.assertEqual(move_details["1"]["2"], 3)
+        self.assertEqual(move_details["4"]["3"], 6)
+
+    def test_last_plan_survives_invalidation(self):
+        fecha = "2023-06-08"
+        asignatura = create_asignatura()
+        moves_data = get_moves(asignatura, fecha)
+
+        examen = Examen.objects.get(COD_SEDE=3)
+        examen.EXAMENES = 5
+        examen.save()
+        self.assertIsNone(cache.get(moves_cache_key(asignatura.COD_ASIGNATURA, fecha)))
+        self.assertEqual(cache.get(last_moves_cache_key(asignatura.COD_ASIGNATURA, fecha)), moves_data)
+
+        moves_data = get_moves(asignatura, fecha)
+        self.assertEqual(moves_data["move_details"], {"1": {"2": 3, "3": 2}})
+
+
+class SolveJobTestCase(AsignaturaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(UserFactory())
+
+    def test_view_solves_through_job(self):
+        response = self.client.get(reverse("tribunales:moves"), {"asignatura": self.job_id})
+        self.assertEqual(response.context["total_moves"], 4)
+        self.assertIsNone(jobs.status(self.job_id))
+
+        response = self.client.get(reverse("tribunales:moves_status"), {"asignatura": self.job_id})
+        self.assertEqual(response.json()["state"], jobs.DONE)
+
+    def test_time_limit(self):
+        self.assertEqual(parse_time_limit("2.5"), 2.5)
+        self.assertEqual(parse_time_limit("1e9"), settings.TRIBUNALES_SOLVER_TIME_LIMIT)
+        for value in ["inf", "nan", "-1", "0", "abc"]:
+            with self.assertRaises(ValueError):
+                parse_time_limit(value)
+            response = self.client.get(reverse("tribunales:moves"), {"asignatura": self.job_id, "time_limit": value})
+            self.assertEqual(response.status_code, 400)
+
+    def test_bad_asignatura(self):
+        for view in ["tribunales:moves", "tribunales:moves_status"]:
+            for value in ["", "1", f"{self.job_id}_1", "x_2023-06-08", "1_fecha"]:
+                response = self.client.get(reverse(view), {"asignatura": value})
+                self.assertEqual(response.status_code, 400, (view, value))
+            response = self.client.get(reverse(view), {"asignatura": moves_cache_key(999, self.fecha)})
+            self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("tribunales:moves_status"))
+        self.assertEqual(response.status_code, 400)
+
+    def test_old_cached_plan(self):
+        cache.set(self.job_id, {"mean": 8, "total_moves": 4, "move_details": {"1": {"2": 4}}})
+        response = self.client.get(reverse("tribunales:moves"), {"asignatura": self.job_id})
+        self.assertEqual(response.context["total_moves"], 4)
+        self.assertIsNone(response.context["gap"])
+        self.assertNotContains(response, "Status:")
+        cache.clear()
+
+    def test_pending(self):
+        cache.set(jobs.JOB_PREFIX + self.job_id, {"state": jobs.RUNNING, "error": None})
+        response = self.client.get(reverse("tribunales:moves"), {"asignatura": self.job_id})
+        self.assertEqual(response.context["job"]["state"], jobs.RUNNING)
+        self.assertContains(response, reverse("tribunales:moves_status"))
+        jobs.forget(self.job_id)
+
+    def test_failed(self):
+        def fail():
+            raise ValueError("boom")
+
+        status = jobs.submit("test", fail)
+        self.assertEqual(status, {"state": jobs.FAILED, "error": "boom"})
+        # Failed jobs can be submitted again
+        self.assertEqual(jobs.submit("test", lambda: None)["state"], jobs.DONE)
+        jobs.forget("test")
+
+
+class WarmMovesTestCase(AsignaturaTestCase):
+    fechas = ("2023-06-08", "2023-06-09")
+
+    def test_warm(self):
+        out = StringIO()
+        call_command("warm_moves", workers=1, stdout=out)
+        self.assertIn("2 plans to compute", out.getvalue())
+        for fecha in ["2023-06-08", "2023-06-09"]:
+            move_data = cache.get(moves_cache_key(self.asignatura.COD_ASIGNATURA, fecha))
+            self.assertEqual(move_data["total_moves"], 4)
+
+        # Cached plans are skipped
+        out = StringIO()
+        call_command("warm_moves", workers=0, stdout=out)
+        self.assertIn("0 plans to compute", out.getvalue())
+
+    def test_filter_fecha(self):
+        out = StringIO()
+        call_command("warm_moves", workers=0, fecha="2023-06-09", stdout=out)
+        self.assertIn("1 plans to compute", out.getvalue())
+        self.assertIsNone(cache.get(moves_cache_key(self.asignatura.COD_ASIGNATURA, "2023-06-08")))
+        self.assertIsNotNone(cache.get(moves_cache_key(self.asignatura.COD_ASIGNATURA, "2023-06-09")))
+
+    @override_settings(TRIBUNALES_SOLVE_SLOTS=1)
+    def test_workers_capped_at_slots(self):
+        for workers in [None, 4]:
+            with mock.patch.object(
+                warm_moves, "ProcessPoolExecutor", wraps=warm_moves.ProcessPoolExecutor
+            ) as executor:
+                call_command("warm_moves", workers=workers, force=True, stdout=StringIO())
+            self.assertEqual(executor.call_args.kwargs["max_workers"], 1)
+
+    def test_solve_slot(self):
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        held = threading.Event()
+
+        def hold_slot():
+            with governor.solve_slot():
+                held.set()
+                time.sleep(0.3)
+
+        with override_settings(
+            TRIBUNALES_SOLVE_SLOTS=1, TRIBUNALES_SOLVE_QUEUE_DEPTH=0, TRIBUNALES_SOLVE_LOCK_DIR=lock_dir.name
+        ), mock.patch.object(warm_moves, "BUSY_RETRY_INTERVAL", 0.05):
+            thread = threading.Thread(target=hold_slot)
+            thread.start()
+            held.wait()
+            # The only slot is taken and there is no queue, the command retries until it is free
+            call_command("warm_moves", workers=0, fecha="2023-06-09", stdout=StringIO())
+            thread.join()
+        record = SolveRecord.objects.get()
+        self.assertGreaterEqual(record.WAIT_TIME, 0.2)
+
+
+class SolveRecordTestCase(AsignaturaTestCase):
+    sede_exams = ((1, 10), (2, 10), (3, 5), (4, 5), (5, 5))
+
+    def test_record(self):
+        get_moves(self.asignatura, self.fecha, backend="highs")
+        get_moves(self.asignatura, self.fecha)
+        record = SolveRecord.objects.get()
+        self.assertEqual(record.KEY, moves_cache_key(self.asignatura.COD_ASIGNATURA, self.fecha))
+        self.assertEqual(record.SEDES, 5)
+        self.assertGreater(record.VARIABLES, 0)
+        self.assertEqual(record.OBJECTIVE, 4)
+        self.assertEqual(record.BACKEND, "highs")
+        self.assertTrue(record.OPTIMAL)
+
+    def test_admin(self):
+        get_moves(self.asignatura, self.fecha)
+        self.client.force_login(UserFactory(is_staff=True, is_superuser=True))
+        response = self.client.get(reverse("admin:tribunales_solverecord_changelist"))
+        self.assertEqual(response.context["solve_stats"]["misses"], 1)
+        self.assertContains(response, "p95 solve time")
+
+    def test_admin_p95(self):
+        fields = dict(SEDES=5, VARIABLES=0, CONSTRAINTS=0, BUILD_TIME=0.0, OBJECTIVE=1, OPTIMAL=True, BACKEND="native")
+        for i in range(1, 21):
+            SolveRecord.objects.create(KEY=f"1_{i}", SOLVE_TIME=i, WAIT_TIME=i / 10, **fields)
+        # Rows older than the window are left out
+        old = SolveRecord.objects.create(KEY="1_0", SOLVE_TIME=100.0, **fields)
+        SolveRecord.objects.filter(pk=old.pk).update(CREATED=timezone.now() - timedelta(days=SOLVE_STATS_DAYS + 1))
+        self.client.force_login(UserFactory(is_staff=True, is_superuser=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:tribunales_solverecord_changelist"))
+        stats = response.context["solve_stats"]
+        self.assertEqual((stats["misses"], stats["p95_solve_time"], stats["p95_wait_time"]), (20, 19.0, 1.9))
+        # The percentiles fetch one row each, not every record
+        self.assertTrue(any("OFFSET 18" in query["sql"] for query in queries.captured_queries))
+
+
+class BenchmarkTestCase(TestCase):
+    def test_generate_instance(self):
+        instance = generate_instance(50, seed=1)
+        self.assertEqual(len(instance), 50)
+        self.assertEqual(instance, generate_instance(50, seed=1))
+        self.assertNotEqual(instance, generate_instance(50, seed=2))
+
+    def test_run_benchmark(self):
+        results = run_benchmark(sizes=[10, 20], time_limit=10)
+        self.assertEqual([result["sedes"] for result in results], [10, 20])
+        for result in results:
+            self.assertGreaterEqual(result["exchanges"], result["bound"])
+        # The instances are rolled back
+        self.assertFalse(Sede.objects.exists())
+
+    def test_solve_times(self):
+        # The times reported are those of the solve, not of a separate model build
+        solve_result = solve({"1": 3, "2": 3}, {"3": 2, "4": 2, "5": 2}, use_memo=False)
+        solve_result.update(build_time=1.5, solve_time=2.5, n_vars=7)
+        with mock.patch("tribunales_evau.tribunales.views.solvers.solve", return_value=solve_result):
+            (result,) = run_benchmark(sizes=[10])
+        self.assertEqual((result["build_time"], result["solve_time"], result["n_vars"]), (1.5, 2.5, 7))
+
+    def test_command_output(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command("benchmark_moves", sizes=[10], output=output.name, stdout=StringIO())
+            report = json.load(output)
+        self.assertEqual(report["results"][0]["sedes"], 10)
+
+
+class LoadDznTestCase(TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_dzn("n=2;\nheadquarter=[|153,1\n |  0,0\n |];\n"), [(153, 1), (0, 0)])
+        with self.assertRaises(ValueError):
+            parse_dzn("n=3;\nheadquarter=[|153,1\n |  0,0\n |];\n")
+        self.assertEqual(asignatura_name("testfiles/EvAU_MATEMATICAS2_2022.dzn"), "MATEMATICAS2")
+
+    def test_load(self):
+        test_file = os.path.join(settings.BASE_DIR, "tribunales_evau/tribunales/testfiles/EvAU_BIOLOGIA_2022.dzn")
+        call_command("load_dzn", test_file, fecha="2023-06-08", stdout=StringIO())
+        asignatura = Asignatura.objects.get(ASIGNATURA="BIOLOGIA")
+        headquarter_data = get_hqs(asignatura, "2023-06-08")
+        self.assertEqual(len(headquarter_data), 15)
+        self.assertEqual(headquarter_data["2"], {"exams": 159, "evals": 2})
+
+        # Loading again replaces the rows and drops the cached plan
+        cache.set(moves_cache_key(asignatura.COD_ASIGNATURA, "2023-06-08"), {})
+        call_command("load_dzn", test_file, fecha="2023-06-08", asignatura="BIOLOGIA", stdout=StringIO())
+        self.assertEqual(Asignatura.objects.count(), 1)
+        self.assertEqual(Examen.objects.count(), 15)
+        self.assertIsNone(cache.get(moves_cache_key(asignatura.COD_ASIGNATURA, "2023-06-08")))
+
+
+class SweepTestCase(AsignaturaTestCase):
+    def test_apply_perturbation(self):
+        data = {"1": {"exams": 12, "evals": 1}}
+        self.assertEqual(
+            apply_perturbation(data, {1: {"evals": 1}, "2": {"exams": -3}}),
+            {"1": {"exams": 12, "evals": 2}, "2": {"exams": 0, "evals": 0}},
+        )
+        self.assertEqual(data, {"1": {"exams": 12, "evals": 1}})
+
+    def test_sweep(self):
+        with self.assertNumQueries(2):
+            results = sweep_moves(
+                self.asignatura, self.fecha, [{}, {1: {"evals": 1}}, {"1": {"evals": 1}}, {2: {"exams": 4}}]
+            )
+        self.assertEqual(results[0], get_moves(self.asignatura, self.fecha))
+        # 24 exams and 4 evaluadores: mean 6, sede 1 keeps all its exams
+        self.assertEqual(results[1]["move_details"], {"3": {"2": 2}})
+        self.assertIs(results[1], results[2])
+        self.assertEqual(results[3]["mean"], 10)
+        self.assertEqual(results[3]["total_moves"], 2)
+
+    def test_solve_slot(self):
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        with override_settings(
+            TRIBUNALES_SOLVE_SLOTS=1, TRIBUNALES_SOLVE_QUEUE_DEPTH=0, TRIBUNALES_SOLVE_LOCK_DIR=lock_dir.name
+        ):
+            with governor.solve_slot():
+                with self.assertRaises(governor.SolverBusy):
+                    sweep_moves(self.asignatura, self.fecha, [{}])
+            self.assertEqual(len(sweep_moves(self.asignatura, self.fecha, [{}, {2: {"exams": 4}}])), 2)
+
+
+class LoadHqsTestCase(TestCase):
+    def test_load_hqs(self):
+        asignatura = Asignatura.objects.create(ASIGNATURA="TEST")
+        for cod_sede, exams, evals in [(1, 12, 1), (2, 4, 0), (3, 8, 2)]:
+            sede = Sede.objects.create(COD_SEDE=cod_sede)
+            if evals:
+                Evaluador.objects.create(COD_SEDE=sede, COD_ASIGNATURA=asignatura, EVALUADORES=evals)
+            Examen.objects.create(COD_SEDE=sede, COD_ASIGNATURA=asignatura, EXAMENES=exams, FECHA="2023-06-08")
+        Examen.objects.create(COD_SEDE_id=3, COD_ASIGNATURA=asignatura, EXAMENES=5, FECHA="2023-06-09")
+        Sede.objects.create(COD_SEDE=4)
+
+        with self.assertNumQueries(2):
+            hqs = load_hqs(asignatura, ["2023-06-08", "2023-06-09"])
+        self.assertEqual(
+            hqs["2023-06-08"],
+            {"1": {"exams": 12, "evals": 1}, "2": {"exams": 4, "evals": 0}, "3": {"exams": 8, "evals": 2}},
+        )
+        self.assertEqual(
+            hqs["2023-06-09"],
+            {"1": {"exams": 0, "evals": 1}, "2": {"exams": 0, "evals": 0}, "3": {"exams": 5, "evals": 2}},
+        )
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        self.asignatura = Asignatura.objects.create(ASIGNATURA="TEST")
+        self.sede = Sede.objects.create(COD_SEDE=1)
+        for fecha in ["2023-06-08", "2023-06-09"]:
+            Examen.objects.create(COD_SEDE=self.sede, COD_ASIGNATURA=self.asignatura, EXAMENES=5, FECHA=fecha)
+        self.client.force_login(UserFactory())
+
+    def tearDown(self):
+        cache.clear()
+
+    def examen_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("tribunales:moves"))
+        return response, [query for query in queries if "tribunales_examen" in query["sql"]]
+
+    def test_catalog(self):
+        with self.assertNumQueries(1):
+            catalog = get_catalog()
+        self.assertEqual(
+            catalog,
+            [
+                (f"{self.asignatura.pk}_2023-06-08", "TEST (2023-06-08)"),
+                (f"{self.asignatura.pk}_2023-06-09", "TEST (2023-06-09)"),
+            ],
+        )
+        with self.assertNumQueries(0):
+            get_catalog()
+
+    def test_fragment(self):
+        response, queries = self.examen_queries()
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, "TEST (2023-06-09)")
+        response, queries = self.examen_queries()
+        self.assertEqual(queries, [])
+        self.assertContains(response, "TEST (2023-06-09)")
+
+        Examen.objects.create(COD_SEDE=self.sede, COD_ASIGNATURA=self.asignatura, EXAMENES=5, FECHA="2023-06-10")
+        self.assertContains(self.client.get(reverse("tribunales:moves")), "TEST (2023-06-10)")
+        self.asignatura.ASIGNATURA = "RENAMED"
+        self.asignatura.save()
+        self.assertContains(self.client.get(reverse("tribunales:moves")), "RENAMED (2023-06-10)")
+
+
+class SedeDirectoryTestCase(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_sede_names(self):
+        Sede.objects.create(COD_SEDE=1, UBICACION="Cantoblanco")
+        sede = Sede.objects.create(COD_SEDE=2, UBICACION="Alcobendas")
+        with self.assertNumQueries(1):
+            self.assertEqual(get_sede_names(), {"1": "Cantoblanco", "2": "Alcobendas"})
+        with self.assertNumQueries(0):
+            get_sede_names()
+
+        sede.UBICACION = "Colmenar"
+        sede.save()
+        self.assertEqual(get_sede_names()["2"], "Colmenar")
+        sede.delete()
+        self.assertEqual(get_sede_names(), {"1": "Cantoblanco"})
+
+    def test_stale(self):
+        Sede.objects.create(COD_SEDE=1, UBICACION="Cantoblanco")
+        get_sede_names()
+        # Created elsewhere: no signal reaches this process
+        Sede.objects.bulk_create([Sede(COD_SEDE=2, UBICACION="Alcobendas")])
+        self.assertNotIn("2", get_sede_names())
+        self.assertEqual(get_sede_names_for(["1", 2])["2"], "Alcobendas")
+        with self.assertNumQueries(1):
+            self.assertNotIn("3", get_sede_names_for([3]))
+        Sede.objects.filter(COD_SEDE=1).update(UBICACION="Colmenar")
+        with mock.patch("time.monotonic", return_value=time.monotonic() + SEDE_DIRECTORY_MAX_AGE + 1):
+            self.assertEqual(get_sede_names()["1"], "Colmenar")
+
+    def test_view(self):
+        asignatura = create_asignatura([(1, 12), (2, 4), (3, 8), (4, 2), (5, 10)])
+        self.client.force_login(UserFactory())
+        params = {"asignatura": moves_cache_key(asignatura.COD_ASIGNATURA, "2023-06-08")}
+        self.client.get(reverse("tribunales:moves"), params)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("tribunales:moves"), params)
+        self.assertEqual(len(response.context["move_details"]), 2)
+        self.assertEqual([query for query in queries if "tribunales_sede" in query["sql"]], [])
+        self.assertContains(response, "<td>Sede 5</td>")
+        self.assertContains(response, "<td>Sede 4</td>")
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "test_dbcache"}}
+    )
+    def test_view_database_cache(self):
+        call_command("createcachetable", verbosity=0)
+        asignatura = create_asignatura([(1, 30), (2, 30), (3, 0), (4, 0), (5, 0), (6, 0)])
+        self.client.force_login(UserFactory())
+        params = {"asignatura": moves_cache_key(asignatura.COD_ASIGNATURA, "2023-06-08")}
+        self.client.get(reverse("tribunales:moves"), params)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("tribunales:moves"), params)
+        self.assertGreaterEqual(len(response.context["move_details"]), 4)
+        # The directory version is read once per page, not once per sede shown
+        self.assertEqual(len([query for query in queries if SEDE_DIRECTORY_VERSION_KEY in query["sql"]]), 1)
+        self.assertEqual([query for query in queries if "tribunales_sede" in query["sql"]], [])
+        self.assertLessEqual(len(queries), 10)
+
+
+class XLSExportTestCase(TestCase):
+    def setUp(self):
+        self.client.force_login(UserFactory())
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_asignatura(self, name, exams, fecha="2023-06-08"):
+        asignatura = Asignatura.objects.create(ASIGNATURA=name)
+        for cod_sede, n in enumerate(exams, 1):
+            sede, _ = Sede.objects.get_or_create(COD_SEDE=cod_sede, defaults={"UBICACION": f"Sede {cod_sede}"})
+            Evaluador.objects.create(COD_SEDE=sede, COD_ASIGNATURA=asignatura, EVALUADORES=1)
+            Examen.objects.create(COD_SEDE=sede, COD_ASIGNATURA=asignatura, EXAMENES=n, FECHA=fecha)
+        get_moves(asignatura, fecha)
+
+    def export(self):
+        get_sede_names()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("tribunales:get_xls"))
+        self.assertTrue(response.streaming)
+        return load_workbook(BytesIO(b"".join(response.streaming_content))), len(queries)
+
+    def test_export(self):
+        self.add_asignatura("MATEMATICAS", [30, 10])
+        wb, n_queries = self.export()
+        self.assertEqual(wb.sheetnames, ["SEDE 1", "SEDE 2"])
+        self.assertEqual(wb["SEDE 1"]["F3"].value, "# Exámenes a Enviar")
+        self.assertEqual(sorted(str(cells) for cells in wb["SEDE 1"].merged_cells.ranges), ["F3:H3", "I3:K3"])
+        rows = list(wb["SEDE 1"].iter_rows(min_row=5, values_only=True))
+        self.assertEqual(rows, [("Jueves", "MATEMATICAS", 30, 1, 20, 10, " ", "2", " ", " ", " ")])
+        rows = list(wb["SEDE 2"].iter_rows(min_row=5, values_only=True))
+        self.assertEqual(rows, [("Jueves", "MATEMATICAS", 10, 1, 20, " ", " ", " ", 10, " ", "1")])
+
+        self.add_asignatura("HISTORIA", [40, 8, 12, 20])
+        self.add_asignatura("HISTORIA", [20, 8, 12, 40], fecha="2023-06-09")
+        wb, more_queries = self.export()
+        self.assertEqual(len(wb.sheetnames), 4)
+        rows = list(wb["SEDE 4"].iter_rows(min_row=5, values_only=True))
+        self.assertEqual(
+            [row[:2] + row[5:8] for row in rows],
+            [("Viernes", "HISTORIA", 12, " ", "2"), ("Viernes", "HISTORIA", 8, " ", "3")],
+        )
+        self.assertEqual(more_queries, n_queries)
+
+    def test_sede_missing_from_directory(self):
+        self.add_asignatura("MATEMATICAS", [30, 10, 20])
+        with mock.patch(
+            "tribunales_evau.tribunales.views.get_sede_names", return_value={"2": "Sede 2", "3": "Sede 3"}
+        ):
+            with self.assertLogs("tribunales_evau.tribunales.views", "WARNING"):
+                wb, _ = self.export()
+        self.assertEqual(wb.sheetnames, ["SEDE 2", "SEDE 3"])
+        rows = list(wb["SEDE 2"].iter_rows(min_row=5, values_only=True))
+        self.assertEqual([row[8:] for row in rows], [(10, " ", "1")])
+
+    def test_uncached_plans(self):
+        self.add_asignatura("MATEMATICAS", [30, 10])
+        asignatura = Asignatura.objects.create(ASIGNATURA="SIN EVALUADORES")
+        Examen.objects.create(COD_SEDE_id=1, COD_ASIGNATURA=asignatura, EXAMENES=5, FECHA="2023-06-08")
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        cache.clear()
+
+        with override_settings(
+            TRIBUNALES_SOLVE_SLOTS=1, TRIBUNALES_SOLVE_QUEUE_DEPTH=0, TRIBUNALES_SOLVE_LOCK_DIR=lock_dir.name
+        ):
+            with governor.solve_slot():
+                response = self.client.get(reverse("tribunales:get_xls"))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response["Retry-After"], "30")
+            # Solved by the job of the next download
+            wb, _ = self.export()
+        self.assertEqual(len(list(wb["SEDE 1"].iter_rows(min_row=5))), 1)
+
+
+class InvalidationTestCase(TestCase):
+    def setUp(self):
+        self.asignatura = Asignatura.objects.create(ASIGNATURA="TEST")
+        self.sede = Sede.objects.create(COD_SEDE=1)
+        self.examen = Examen.objects.create(
+            COD_SEDE=self.sede, COD_ASIGNATURA=self.asignatura, EXAMENES=5, FECHA="2023-06-08"
+        )
+        Examen.objects.create(COD_SEDE=self.sede, COD_ASIGNATURA=self.asignatura, EXAMENES=5, FECHA="2023-06-09")
+        self.keys = [moves_cache_key(self.asignatura.pk, fecha) for fecha in ["2023-06-08", "2023-06-09"]]
+        cache.set_many({key: {"move_details": {}} for key in self.keys})
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_examen_moved(self):
+        new_key = moves_cache_key(self.asignatura.pk, "2023-06-10")
+        cache.set(new_key, {"move_details": {}})
+        self.examen.FECHA = "2023-06-10"
+        self.examen.save()
+        self.assertEqual(list(cache.get_many(self.keys + [new_key])), [self.keys[1]])
+
+    def test_examen_deleted(self):
+        self.examen.delete()
+        self.assertEqual(list(cache.get_many(self.keys)), [self.keys[1]])
+
+    def test_evaluador(self):
+        evaluador = Evaluador.objects.create(COD_SEDE=self.sede, COD_ASIGNATURA=self.asignatura, EVALUADORES=1)
+        self.assertEqual(cache.get_many(self.keys), {})
+        cache.set_many({key: {"move_details": {}} for key in self.keys})
+        evaluador.delete()
+        self.assertEqual(cache.get_many(self.keys), {})
+
+
+class DifferentialTestCase(TestCase):
+    def test_engines_agree(self):
+        self.assertEqual(run_check(20, seed=1), [])
+
+    def test_check_plan(self):
+        surplus, deficit = {"1": 4}, {"2": 3, "3": 2}
+        self.assertEqual(check_plan({"1": {"2": 3, "3": 1}}, surplus, deficit), [])
+        self.assertEqual(check_plan({"1": {"2": 4}}, surplus, deficit), ["1 -> 2 moves 4 exams", "2 receives 4 of 3"])
+        self.assertEqual(check_plan({"1": {"2": 3}}, surplus, deficit), ["1 sends 3 of 4"])
+
+    def test_failures_written(self):
+        def overconfident(surplus, deficit):
+            return {"move_details": greedy.solve(surplus, deficit), "optimal": True}
+
+        engines = {"native": get_engines()["native"], "overconfident": overconfident}
+        with tempfile.TemporaryDirectory() as output_dir:
+            failures = run_check(200, seed=1, output_dir=output_dir, engines=engines)
+            self.assertTrue(failures)
+            instance, errors = failures[0]
+            self.assertTrue(errors[0].startswith("overconfident:"))
+            files = sorted(os.listdir(output_dir))
+            self.assertEqual(len(files), len(failures))
+            with open(os.path.join(output_dir, files[0])) as file:
+                self.assertEqual(parse_dzn(file.read()), instance)
+
+    def test_format_dzn(self):
+        with open(
+            os.path.join(settings.BASE_DIR, "tribunales_evau/tribunales/testfiles/EvAU_BIOLOGIA_2022.dzn")
+        ) as file:
+            text = file.read()
+        self.assertEqual(format_dzn(parse_dzn(text)), text)
+
+
+class GovernorTestCase(TestCase):
+    def setUp(self):
+        self.lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.lock_dir.cleanup)
+
+    def settings_for(self, slots, queue_depth):
+        return override_settings(
+            TRIBUNALES_SOLVE_SLOTS=slots,
+            TRIBUNALES_SOLVE_QUEUE_DEPTH=queue_depth,
+            TRIBUNALES_SOLVE_LOCK_DIR=self.lock_dir.name,
+        )
+
+    def test_busy(self):
+        with self.settings_for(1, 0):
+            with governor.solve_slot() as wait_time:
+                self.assertEqual(wait_time, 0)
+                with self.assertRaises(governor.SolverBusy):
+                    with governor.solve_slot():
+                        pass
+            # The slot is free again
+            with governor.solve_slot():
+                pass
+
+    def test_queued(self):
+        waits = []
+
+        def queued():
+            with governor.solve_slot() as wait_time:
+                waits.append(wait_time)
+
+        with self.settings_for(1, 1):
+            with governor.solve_slot():
+                thread = threading.Thread(target=queued)
+                thread.start()
+                time.sleep(0.2)
+                self.assertEqual(waits, [])
+            thread.join()
+        self.assertGreaterEqual(waits[0], 0.2)
+
+    def test_view_busy(self):
+        asignatura = create_asignatura()
+        job_id = moves_cache_key(asignatura.COD_ASIGNATURA, "2023-06-08")
+        self.client.force_login(UserFactory())
+
+        with self.settings_for(1, 0):
+            with governor.solve_slot():
+                response = self.client.get(reverse("tribunales:moves"), {"asignatura": job_id})
+                self.assertEqual(response.context["job"]["state"], jobs.BUSY)
+                self.assertIsNone(jobs.status(job_id))
+                response = self.client.get(reverse("tribunales:moves_status"), {"asignatura": job_id})
+                self.assertEqual(response.json()["state"], jobs.BUSY)
+            # The next poll runs the job once a slot is free
+            response = self.client.get(reverse("tribunales:moves_status"), {"asignatura": job_id})
+            self.assertEqual(response.json()["state"], jobs.DONE)
+        cache.clear()
+
+    def test_view_busy_after_done(self):
+        asignatura = create_asignatura()
+        job_id = moves_cache_key(asignatura.COD_ASIGNATURA, "2023-06-08")
+        self.client.force_login(UserFactory())
+        # Done in another process, whose cached plan this one cannot see
+        cache.set(jobs.JOB_PREFIX + job_id, {"state": jobs.DONE, "error": None})
+
+        with self.settings_for(1, 0):
+            with governor.solve_slot():
+                response = self.client.get(reverse("tribunales:moves"), {"asignatura": job_id, "time_limit": "5"})
+            self.assertEqual(response.context["job"]["state"], jobs.BUSY)
+            self.assertContains(response, "time_limit=5.0")
+            with mock.patch.object(jobs, "submit", wraps=jobs.submit) as submit:
+                response = self.client.get(
+                    reverse("tribunales:moves_status"), {"asignatura": job_id, "time_limit": "5"}
+                )
+            self.assertEqual(response.json()["state"], jobs.DONE)
+            self.assertEqual(submit.call_args.kwargs["time_limit"], 5.0)
+        cache.clear()
+
+
+class SolverPoolTestCase(TestCase):
+    surplus = {"1": 3, "2": 3}
+    deficit = {"3": 2, "4": 2, "5": 2}
+
+    def test_recycle(self):
+        solver_pool = SolverPool(1, max_solves=2)
+        self.addCleanup(solver_pool.close)
+        pids = []
+        for _ in range(3):
+            pids.append(next(iter(solver_pool.workers))[0].pid)
+            result = solver_pool.solve("native", self.surplus, self.deficit)
+            self.assertEqual(
+                result["move_details"], BACKENDS["native"].solve(self.surplus, self.deficit)["move_details"]
+            )
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def test_errors(self):
+        solver_pool = SolverPool(1)
+        self.addCleanup(solver_pool.close)
+        with self.assertRaises(KeyError):
+            solver_pool.solve("unknown", self.surplus, self.deficit)
+        process, _ = next(iter(solver_pool.workers))
+        process.kill()
+        process.join()
+        with self.assertRaises(RuntimeError):
+            solver_pool.solve("native", self.surplus, self.deficit)
+        # A new process took its place
+        self.assertEqual(count_exchanges(solver_pool.solve("native", self.surplus, self.deficit)["move_details"]), 4)
+
+    @mock.patch.object(pool, "TIMEOUT_MARGIN", 0)
+    def test_timeout(self):
+        solver_pool = SolverPool(1)
+        self.addCleanup(solver_pool.close)
+        worker = solver_pool.idle.get()
+        with self.assertRaises(governor.SolverBusy):
+            solver_pool.solve("native", self.surplus, self.deficit, time_limit=0.1)
+        # A worker that never answers is killed and replaced
+        solver_pool.idle.put(worker)
+        process, _ = worker
+        os.kill(process.pid, signal.SIGSTOP)
+        with self.assertRaises(RuntimeError):
+            solver_pool.solve("native", self.surplus, self.deficit, time_limit=0.1)
+        self.assertFalse(process.is_alive())
+        self.assertEqual(count_exchanges(solver_pool.solve("native", self.surplus, self.deficit)["move_details"]), 4)
+
+    def test_started_by_server_entry_points(self):
+        for module in ["config.wsgi", "config.asgi"]:
+            sys.modules.pop(module, None)
+            with mock.patch.object(pool, "get_pool") as get_pool:
+                importlib.import_module(module)
+            get_pool.assert_called_once_with()
+
+    @override_settings(TRIBUNALES_SOLVER_PROCESSES=1)
+    def test_solve(self):
+        self.addCleanup(setattr, pool, "_pool", None)
+        self.addCleanup(lambda: pool._pool.close())
+        with mock.patch.object(BACKENDS["highs"], "solve", side_effect=AssertionError("solved in the web process")):
+            result = solve(self.surplus, self.deficit, backend="highs", use_memo=False)
+        self.assertEqual(result["backend"], "highs")
+        self.assertEqual(count_exchanges(result["move_details"]), 4)
@@ -1,9 +1,10 @@
 from django.urls import path
 
-from .views import MovesView, MovesXLSView
+from .views import MovesStatusView, MovesView, MovesXLSView
 
 app_name = "tribunales"
 urlpatterns = [
     path("", MovesView.as_view(), name="moves"),
     path("get-xls/", MovesXLSView.as_view(), name="get_xls"),
+    path("status/", MovesStatusView.as_view(), name="moves_status"),
 ]
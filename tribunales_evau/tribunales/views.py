@@ -1,26 +1,41 @@
+import itertools
 import logging
-from math import ceil
+import tempfile
+from datetime import date
+from math import ceil, isfinite
 
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.cache import cache
-from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.urls import reverse_lazy
 from django.views import View
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
-from pulp import LpMinimize, LpProblem, LpVariable, lpSum, value
-from pulp.apis import PULP_CBC_CMD
-from tribunales.models import Asignatura, Evaluador, Examen, Sede
+from tribunales.models import (
+    CATALOG_CACHE_KEY,
+    Asignatura,
+    Evaluador,
+    Examen,
+    SolveRecord,
+    get_sede_names,
+    get_sede_names_for,
+    last_moves_cache_key,
+    moves_cache_key,
+)
+
+from . import governor, jobs, solvers
 
 logger = logging.getLogger(__name__)
 
 # CACHE_PREFIX = "moves_"
 
-weekday_names_es = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+# Plans not proven optimal are retried after this many seconds
+SUBOPTIMAL_CACHE_TIMEOUT = 60 * 15
 
-M = 10000
+weekday_names_es = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
 
 
 def get_fechas(asignatura):
@@ -29,102 +44,155 @@ def get_fechas(asignatura):
     return fechas
 
 
-def get_hqs(asignatura, fecha):
-    sedes = Sede.objects.all()
+def get_catalog():
+    """``[(value, label), ...]`` of every asignatura and fecha with exams, for the selector."""
+    catalog = cache.get(CATALOG_CACHE_KEY)
+    if catalog is None:
+        rows = (
+            Examen.objects.values("COD_ASIGNATURA", "COD_ASIGNATURA__ASIGNATURA", "FECHA")
+            .distinct()
+            .order_by("COD_ASIGNATURA", "FECHA")
+        )
+        catalog = [
+            (f"{row['COD_ASIGNATURA']}_{row['FECHA']}", f"{row['COD_ASIGNATURA__ASIGNATURA']} ({row['FECHA']})")
+            for row in rows
+        ]
+        # Dropped by the Examen and Asignatura signals
+        cache.set(CATALOG_CACHE_KEY, catalog, timeout=None)
+    return catalog
+
+
+def load_hqs(asignatura, fechas):
+    """
+    ``{fecha: headquarter_data}`` for ``asignatura`` on each of ``fechas``, read
+    with one query per table. Sedes with neither exams nor evaluators of the
+    subject are left out, they never send or receive exams.
+    """
+    fechas = {str(fecha): fecha for fecha in fechas}
+    examenes = Examen.objects.filter(COD_ASIGNATURA=asignatura, FECHA__in=list(fechas)).values_list(
+        "FECHA", "COD_SEDE", "EXAMENES"
+    )
+    evaluadores = dict(Evaluador.objects.filter(COD_ASIGNATURA=asignatura).values_list("COD_SEDE", "EVALUADORES"))
+    sedes = sorted(evaluadores.keys() | {cod_sede for _, cod_sede, _ in examenes})
 
-    headquarter_data = {}
-    for sede in sedes:
-        sede_id = sede.COD_SEDE
-        try:
-            examenes = Examen.objects.get(COD_SEDE=sede_id, COD_ASIGNATURA=asignatura, FECHA=fecha)
-            exams = examenes.EXAMENES
-        except ObjectDoesNotExist:
-            logger.debug(f"No Examen for sede={sede_id}, asignatura={asignatura} and fecha={fecha}")
-            exams = 0
-        try:
-            evaluadores = Evaluador.objects.get(COD_SEDE=sede_id, COD_ASIGNATURA=asignatura)
-            evals = evaluadores.EVALUADORES
-        except ObjectDoesNotExist:
-            logger.debug(f"No Evaluador for sede={sede_id} and asignatura={asignatura}")
-            evals = 0
-        if str(sede_id) not in headquarter_data:
-            headquarter_data[str(sede_id)] = {"exams": 0, "evals": 0}
-        headquarter_data[str(sede_id)]["exams"] += exams
-        headquarter_data[str(sede_id)]["evals"] += evals
+    hqs = {
+        fecha: {str(cod_sede): {"exams": 0, "evals": evaluadores.get(cod_sede, 0)} for cod_sede in sedes}
+        for fecha in fechas.values()
+    }
+    for fecha, cod_sede, n in examenes:
+        hqs[fechas[str(fecha)]][str(cod_sede)]["exams"] = n
+    return hqs
+
+
+def get_hqs(asignatura, fecha):
+    headquarter_data = load_hqs(asignatura, [fecha])[fecha]
 
     logger.debug("hq_data: " + str(headquarter_data))
 
     return headquarter_data
 
 
-def problem_solve(headquarter_data, mean, HQs_from, HQs_to):
-    # LP problem
-    prob = LpProblem("Headquarters_Movement", LpMinimize)
+def split_hqs(headquarter_data):
+    mean = ceil(
+        # mean = floor(
+        sum(data["exams"] for data in headquarter_data.values())
+        / sum(data["evals"] for data in headquarter_data.values())
+    )
 
-    # num_exchanges = LpVariable("num_exchanges", lowBound=0, cat="Integer")  # The number of exchanges
+    HQs = list(headquarter_data.keys())
+    HQs_from = []
+    HQs_to = []
+    for HQ in HQs:
+        if mean * headquarter_data[HQ]["evals"] > headquarter_data[HQ]["exams"]:
+            HQs_to.append(HQ)
+        else:
+            HQs_from.append(HQ)
+    return mean, HQs_from, HQs_to
 
-    moves = LpVariable.dicts("moves", (HQs_from, HQs_to), lowBound=0, cat="Integer")  # number of moved exams
-    exchanges = LpVariable.dicts("is_moved", (HQs_from, HQs_to), cat="Binary")
 
-    # Total number of exams moved -> not needed
-    # prob += num_moves == lpSum(moves[i][j] for i in HQ for j in HQ)
+def get_imbalances(headquarter_data, mean, HQs_from, HQs_to):
+    surplus = {}
+    for i in HQs_from:
+        surplus[i] = max(headquarter_data[i]["exams"] - (mean * headquarter_data[i]["evals"]), 0)
+    deficit = {}
+    for j in HQs_to:
+        deficit[j] = (mean * headquarter_data[j]["evals"]) - headquarter_data[j]["exams"]
+    return surplus, deficit
 
-    # Objective: Minimize total number of exchanges
-    prob += lpSum(exchanges[i][j] for i in HQs_from for j in HQs_to)
 
-    # Constraints
-    for i in HQs_from:
-        for j in HQs_to:
-            prob += exchanges[i][j] <= moves[i][j]
-            prob += exchanges[i][j] * M >= moves[i][j]  # M is a large number
-            prob += moves[i][j] >= 0
-            prob += moves[i][j] <= max(
-                0,
-                min(
-                    headquarter_data[i]["exams"] - (mean * headquarter_data[i]["evals"]),  # los que sobran a i
-                    max(
-                        (mean * headquarter_data[j]["evals"]) - headquarter_data[j]["exams"], 0
-                    ),  # los que le faltan a j
-                ),
-            )
+def problem_solve(
+    headquarter_data, mean, HQs_from, HQs_to, backend=None, time_limit=None, warm_start=None, use_memo=True
+):
+    surplus, deficit = get_imbalances(headquarter_data, mean, HQs_from, HQs_to)
+    return solvers.solve(
+        surplus, deficit, backend=backend, time_limit=time_limit, warm_start=warm_start, use_memo=use_memo
+    )
 
-    for i in HQs_from:
-        prob += lpSum(moves[i][j] for j in HQs_to) == max(
-            headquarter_data[i]["exams"] - (mean * headquarter_data[i]["evals"]), 0
-        )
 
-    for j in HQs_to:
-        prob += (
-            lpSum(moves[i][j] for i in HQs_from)
-            == (mean * headquarter_data[j]["evals"]) - headquarter_data[j]["exams"]
-        )
+def compute_moves(headquarter_data, backend=None, time_limit=None, warm_start=None, label=""):
+    if sum(data["evals"] for data in headquarter_data.values()) == 0:
+        logger.debug("No data in DB")
+        return {"mean": None, "total_moves": None, "move_details": None, "optimal": None, "gap": None}, None
 
-    # prob.solve(PULP_CBC_CMD(msg=False, options=['TimeLimit=60'], mip=True)) # Time-limited version
-    prob.solve(PULP_CBC_CMD(msg=False, mip=True))
+    mean, HQs_from, HQs_to = split_hqs(headquarter_data)
+    result = problem_solve(
+        headquarter_data, mean, HQs_from, HQs_to, backend=backend, time_limit=time_limit, warm_start=warm_start
+    )
+    move_details = result["move_details"]
 
-    print("moves")
-    for i in HQs_from:
-        print([moves[i][j].value() for j in HQs_to])
-    print("exchanges")
-    for i in HQs_from:
-        print([exchanges[i][j].value() for j in HQs_to])
-    print(f"obj_value: {prob.objective.value()}")
+    total_moves = 0
+    for key in move_details:
+        total_moves += sum(move_details[key].values())
 
-    move_details = {}
-    for HQ_from in moves:
-        for HQ_to in moves[HQ_from]:
-            if int(value(moves[HQ_from][HQ_to])) > 0:
-                if HQ_from not in move_details:
-                    move_details[HQ_from] = {}
-                move_details[HQ_from][HQ_to] = int(value(moves[HQ_from][HQ_to]))
-                # print(str(HQ_from)+","+str(HQ_to)+": "+str(value(moves[HQ_from][HQ_to]))+
-                #       "*"+str(value(exchanges[HQ_from][HQ_to]))+" = "+str(move_details[HQ_from][HQ_to]))
+    move_data = {
+        "mean": mean,
+        "total_moves": total_moves,
+        "move_details": move_details,
+        "optimal": result["optimal"],
+        "gap": result["gap"],
+    }
+    logger.debug(
+        f"Solved {label} with {result['backend']}: "
+        f"build {result['build_time']:.4f}s, solve {result['solve_time']:.4f}s"
+    )
+    if not result["optimal"]:
+        logger.warning(f"Plan for {label} not proven optimal, gap {result['gap']:.0%}")
+    return move_data, result
+
+
+def record_solve(cod_asignatura, fecha, result, wait_time=0.0):
+    SolveRecord.objects.create(
+        KEY=moves_cache_key(cod_asignatura, fecha),
+        SEDES=result["sedes"],
+        VARIABLES=result["n_vars"],
+        CONSTRAINTS=result["n_constraints"],
+        BUILD_TIME=result["build_time"],
+        SOLVE_TIME=result["solve_time"],
+        OBJECTIVE=solvers.count_exchanges(result["move_details"]),
+        OPTIMAL=result["optimal"],
+        BACKEND=result["backend"],
+        WAIT_TIME=wait_time,
+    )
 
-    return move_details
 
+def store_moves(cod_asignatura, fecha, move_data):
+    if move_data["move_details"] is None:
+        return
+    cache.set(
+        moves_cache_key(cod_asignatura, fecha),
+        move_data,
+        timeout=None if move_data["optimal"] else SUBOPTIMAL_CACHE_TIMEOUT,
+    )
+    cache.set(last_moves_cache_key(cod_asignatura, fecha), move_data, timeout=None)
 
-def get_moves(asignatura, fecha):
-    move_data = cache.get(str(asignatura.COD_ASIGNATURA) + "_" + str(fecha))
+
+def get_last_move_details(cod_asignatura, fecha):
+    last_move_data = cache.get(last_moves_cache_key(cod_asignatura, fecha))
+    return last_move_data["move_details"] if last_move_data else None
+
+
+def get_moves(asignatura, fecha, backend=None, time_limit=None):
+    move_data = cache.get(moves_cache_key(asignatura.COD_ASIGNATURA, fecha))
 
     if move_data is not None:
         return move_data
@@ -132,68 +200,120 @@ def get_moves(asignatura, fecha):
     logger.debug("Recalculating moves for " + str(asignatura))
 
     headquarter_data = get_hqs(asignatura, fecha)
+    with governor.solve_slot() as wait_time:
+        if wait_time:
+            # Another process may have solved it while this one was queued
+            move_data = cache.get(moves_cache_key(asignatura.COD_ASIGNATURA, fecha))
+            if move_data is not None:
+                return move_data
+        move_data, result = compute_moves(
+            headquarter_data,
+            backend=backend,
+            time_limit=time_limit,
+            warm_start=get_last_move_details(asignatura.COD_ASIGNATURA, fecha),
+            label=f"{asignatura} ({fecha})",
+        )
+    if result is None:
+        return move_data
 
-    if sum(data["evals"] for data in headquarter_data.values()) == 0:
-        logger.debug("No data in DB")
-        return {"mean": None, "total_moves": None, "move_details": None}
+    record_solve(asignatura.COD_ASIGNATURA, fecha, result, wait_time=wait_time)
+    store_moves(asignatura.COD_ASIGNATURA, fecha, move_data)
+    return cache.get(moves_cache_key(asignatura.COD_ASIGNATURA, fecha))
 
-    mean = ceil(
-        # mean = floor(
-        sum(data["exams"] for data in headquarter_data.values())
-        / sum(data["evals"] for data in headquarter_data.values())
-    )
 
-    HQs = list(headquarter_data.keys())
-    HQs_from = []
-    HQs_to = []
-    for HQ in HQs:
-        if mean * headquarter_data[HQ]["evals"] > headquarter_data[HQ]["exams"]:
-            HQs_to.append(HQ)
-        else:
-            HQs_from.append(HQ)
+def parse_time_limit(value):
+    """
+    Seconds in the ``time_limit`` parameter, capped at
+    TRIBUNALES_SOLVER_TIME_LIMIT. Raises ValueError unless it is a finite
+    positive number.
+    """
+    time_limit = float(value)
+    if not isfinite(time_limit) or time_limit <= 0:
+        raise ValueError(f"time_limit must be a positive number of seconds, not {value}")
+    max_time_limit = getattr(settings, "TRIBUNALES_SOLVER_TIME_LIMIT", None)
+    return time_limit if max_time_limit is None else min(time_limit, max_time_limit)
 
-    move_details = problem_solve(headquarter_data, mean, HQs_from, HQs_to)
 
-    total_moves = 0
-    for key in move_details:
-        total_moves += sum(move_details[key].values())
+def parse_asignatura_fecha(value):
+    """``(cod_asignatura, fecha)`` of a selector value ``"<cod_asignatura>_<fecha>"``, ValueError if malformed."""
+    cod_asignatura, fecha = value.split("_")
+    if not cod_asignatura.isdigit():
+        raise ValueError(f"Invalid asignatura code {cod_asignatura!r}")
+    date.fromisoformat(fecha)
+    return cod_asignatura, fecha
 
-    move_data = {"mean": mean, "total_moves": total_moves, "move_details": move_details}
 
-    cache.set(str(asignatura.COD_ASIGNATURA) + "_" + str(fecha), move_data, timeout=None)
-    return cache.get(str(asignatura.COD_ASIGNATURA) + "_" + str(fecha))
+def get_time_limit(request):
+    value = request.GET.get("time_limit")
+    return parse_time_limit(value) if value else None
 
 
 class MovesView(LoginRequiredMixin, View):
     login_url = reverse_lazy("account_login")
 
+    def render_job(self, request, cod_asignatura_fecha, time_limit, status):
+        return render(
+            request,
+            "moves_template.html",
+            {
+                "asignaturas": self.asignaturas_fecha,
+                "nombre_asignatura": self.nombre_asignatura,
+                "cod_asignatura_fecha": cod_asignatura_fecha,
+                "time_limit": time_limit,
+                "job": status,
+            },
+        )
+
     def get(self, request):
         cod_asignatura_fecha = request.GET.get("asignatura")
 
-        asignaturas = Asignatura.objects.all()
-        self.asignaturas_fecha = []
-        for asignatura in asignaturas:
-            fechas = get_fechas(asignatura)
-            for fecha in fechas:
-                self.asignaturas_fecha.append(
-                    (str(asignatura.COD_ASIGNATURA) + "_" + str(fecha), f"{asignatura.ASIGNATURA} ({fecha})")
-                )
+        # Called by the template only when the cached <option> list is gone
+        self.asignaturas_fecha = get_catalog
 
         # When called after form was completed, you'll have cod_asignatura filled
         if cod_asignatura_fecha is not None:
-            parts = cod_asignatura_fecha.split("_")
-            cod_asignatura = parts[0]
-            fecha = parts[1]
-            asignatura = Asignatura.objects.get(COD_ASIGNATURA=cod_asignatura)
+            try:
+                cod_asignatura, fecha = parse_asignatura_fecha(cod_asignatura_fecha)
+            except ValueError:
+                return HttpResponseBadRequest("asignatura debe ser <código>_<fecha>")
+            asignatura = get_object_or_404(Asignatura, COD_ASIGNATURA=cod_asignatura)
             self.nombre_asignatura = asignatura.ASIGNATURA + (f" ({fecha})")
 
-            move_data = get_moves(asignatura, fecha)
+            try:
+                time_limit = get_time_limit(request)
+            except ValueError:
+                return HttpResponseBadRequest("time_limit debe ser un número de segundos positivo")
+
+            # Solve in the background and let the page poll MovesStatusView until the plan is ready
+            job_id = moves_cache_key(asignatura.COD_ASIGNATURA, fecha)
+            if cache.get(job_id) is None:
+                status = jobs.status(job_id)
+                if status is None:
+                    status = jobs.submit(job_id, get_moves, asignatura, fecha, time_limit=time_limit)
+                if status["state"] in (jobs.FAILED, jobs.BUSY):
+                    # Show the error once, the next request retries
+                    jobs.forget(job_id)
+                if status["state"] != jobs.DONE:
+                    return self.render_job(request, cod_asignatura_fecha, time_limit, status)
+            jobs.forget(job_id)
+
+            try:
+                # Solves again if the plan is gone from the cache (evicted, or cached by another process)
+                move_data = get_moves(asignatura, fecha, time_limit=time_limit)
+            except governor.SolverBusy as e:
+                return self.render_job(
+                    request, cod_asignatura_fecha, time_limit, {"state": jobs.BUSY, "error": str(e)}
+                )
             move_details = []
             if move_data["move_details"] is not None:
+                # One directory lookup for the whole plan, unknown sedes are shown by their code
+                sede_names = get_sede_names_for(
+                    {hq for from_HQ, row in move_data["move_details"].items() for hq in [from_HQ, *row]}
+                )
                 for from_HQ in move_data["move_details"].keys():
                     for to_HQ in move_data["move_details"][from_HQ].keys():
-                        from_sede = Sede.objects.get(COD_SEDE=from_HQ).UBICACION
-                        to_sede = Sede.objects.get(COD_SEDE=to_HQ).UBICACION
+                        from_sede = sede_names.get(from_HQ, from_HQ)
+                        to_sede = sede_names.get(to_HQ, to_HQ)
                         n_exams = int(move_data["move_details"][from_HQ][to_HQ])
                         if n_exams > 0:
                             move_details.append(
@@ -212,6 +332,9 @@ class MovesView(LoginRequiredMixin, View):
                     "nombre_asignatura": self.nombre_asignatura,
                     "mean": move_data["mean"],
                     "total_moves": move_data["total_moves"],
+                    # Plans cached before the solver reported these have neither key
+                    "optimal": move_data.get("optimal"),
+                    "gap": None if move_data.get("gap") is None else round(100 * move_data["gap"], 1),
                     "move_details": move_details,
                 },
             )
@@ -219,21 +342,43 @@ class MovesView(LoginRequiredMixin, View):
             return render(request, "moves_template.html", {"asignaturas": self.asignaturas_fecha})
 
 
-class MovesXLSView(LoginRequiredMixin, View):
+class MovesStatusView(LoginRequiredMixin, View):
     login_url = reverse_lazy("account_login")
 
-    moves_data = {}
+    def get(self, request):
+        try:
+            cod_asignatura, fecha = parse_asignatura_fecha(request.GET.get("asignatura", ""))
+        except ValueError:
+            return HttpResponseBadRequest("asignatura debe ser <código>_<fecha>")
+        job_id = moves_cache_key(cod_asignatura, fecha)
+        if cache.get(job_id) is not None:
+            return JsonResponse({"state": jobs.DONE, "error": None})
+
+        status = jobs.status(job_id)
+        if status is None or status["state"] == jobs.BUSY:
+            # Lost (expired or evicted) jobs are resubmitted, and jobs turned away by a full solve
+            # queue are retried on each poll
+            try:
+                time_limit = get_time_limit(request)
+            except ValueError:
+                return HttpResponseBadRequest("time_limit debe ser un número de segundos positivo")
+            asignatura = get_object_or_404(Asignatura, COD_ASIGNATURA=cod_asignatura)
+            status = jobs.submit(job_id, get_moves, asignatura, fecha, time_limit=time_limit)
+        return JsonResponse(status)
+
+
+class MovesXLSView(LoginRequiredMixin, View):
+    login_url = reverse_lazy("account_login")
 
     def print_header(self, ws, sede):
+        # Write-only sheets are written top to bottom, so the header rows are appended in order
         sede_title = [" ", "SEDE " + str(sede), " ", " ", "Intercambio de exámenes con otras sedes"]
-        ws.append(sede_title)
-        row = ws.row_dimensions[1]
-        row.font = Font(bold=True)
+        ws.append([self.bold_cell(ws, value) for value in sede_title])
+        ws.append([])
 
-        ws.merge_cells(start_row=3, start_column=6, end_row=3, end_column=8)
-        ws.merge_cells(start_row=3, start_column=9, end_row=3, end_column=11)
-        ws["F3"] = "# Exámenes a Enviar"
-        ws["I3"] = "# Exámenes a recibir"
+        ws.append([None] * 5 + ["# Exámenes a Enviar", None, None, "# Exámenes a recibir"])
+        ws.merged_cells.add("F3:H3")
+        ws.merged_cells.add("I3:K3")
 
         header = [
             " ",
@@ -250,45 +395,88 @@ class MovesXLSView(LoginRequiredMixin, View):
         ]
         ws.append(header)
 
-    def get(self, request):
-        response = HttpResponse(content_type="application/ms-excel")
-        response["Content-Disposition"] = 'attachment; filename="sede_data.xlsx"'
+    def bold_cell(self, ws, value):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        return cell
+
+    def get_plans(self, asignaturas_with_evals):
+        """
+        Plan of every asignatura and fecha with exams, the cached ones read at
+        once. The missing ones are solved in background jobs and the number
+        still pending is returned with the plans.
+        """
+        keys = {
+            moves_cache_key(cod_asignatura, fecha): (cod_asignatura, name, fecha)
+            for cod_asignatura, name, fecha in Examen.objects.values_list(
+                "COD_ASIGNATURA", "COD_ASIGNATURA__ASIGNATURA", "FECHA"
+            ).distinct()
+        }
+        plans = cache.get_many(keys)
+        pending = 0
+        for key, (cod_asignatura, name, fecha) in keys.items():
+            if key in plans:
+                continue
+            if cod_asignatura not in asignaturas_with_evals:
+                # Nothing to solve, get_moves would not cache a plan either
+                plans[key] = {"mean": None, "move_details": None}
+                continue
+            status = jobs.status(key)
+            if status is None or status["state"] not in (jobs.QUEUED, jobs.RUNNING):
+                status = jobs.submit(key, get_moves, Asignatura(COD_ASIGNATURA=cod_asignatura, ASIGNATURA=name), fecha)
+            # Done right away with TRIBUNALES_SOLVE_WORKERS = 0
+            move_data = cache.get(key) if status["state"] == jobs.DONE else None
+            if move_data is None:
+                pending += 1
+            else:
+                plans[key] = move_data
+        return plans, pending
 
-        wb = Workbook()
-        # Remove the default first sheet
-        default_sheet = wb.active
-        wb.remove(default_sheet)
+    def get(self, request):
+        # Fetch data from DB, one query per table
+        sedes = sorted(get_sede_names(refresh=True), key=int)
+        evaluadores_by_sede = {
+            (str(cod_sede), cod_asignatura): n
+            for cod_sede, cod_asignatura, n in Evaluador.objects.values_list(
+                "COD_SEDE", "COD_ASIGNATURA", "EVALUADORES"
+            )
+        }
+        asignaturas_with_evals = {cod_asignatura for (_, cod_asignatura), n in evaluadores_by_sede.items() if n > 0}
+        plans, pending = self.get_plans(asignaturas_with_evals)
+        if pending:
+            response = HttpResponse(
+                f"Se están calculando {pending} repartos, vuelve a descargar la hoja en unos minutos",
+                status=503,
+                content_type="text/plain; charset=utf-8",
+            )
+            response["Retry-After"] = "30"
+            return response
 
-        # Fetch data from DB
-        sedes = Sede.objects.all()
+        # Rows go to temporary files as they are written, so memory does not grow with the data
+        wb = Workbook(write_only=True)
+        examenes = (
+            Examen.objects.select_related("COD_ASIGNATURA").order_by("COD_SEDE", "FECHA", "COD_ASIGNATURA").iterator()
+        )
+        examenes_by_sede = itertools.groupby(examenes, key=lambda examen: examen.COD_SEDE_id)
+        next_sede, next_examenes = next(examenes_by_sede, (None, []))
 
-        for sede in sedes:
+        for cod_sede in sedes:
             # Create a new sheet for each SEDE
-            ws = wb.create_sheet(title="SEDE " + str(sede.COD_SEDE))
-            self.print_header(ws, sede.COD_SEDE)
-
-            queryset = (
-                Examen.objects.filter(COD_SEDE_id=sede.COD_SEDE)
-                .select_related("COD_ASIGNATURA")
-                .order_by("FECHA", "COD_ASIGNATURA")
-            )
+            ws = wb.create_sheet(title="SEDE " + cod_sede)
+            self.print_header(ws, cod_sede)
+            # Sedes created since the directory was read are skipped, not left blocking the later ones
+            while next_sede is not None and next_sede < int(cod_sede):
+                logger.warning(f"Sede {next_sede} is not in the sede directory, its exams are left out of the XLS")
+                next_sede, next_examenes = next(examenes_by_sede, (None, []))
+            if next_sede != int(cod_sede):
+                continue
 
             # Write data rows
-            for examen in queryset:
-                try:
-                    evaluadores = Evaluador.objects.get(
-                        COD_SEDE=sede.COD_SEDE, COD_ASIGNATURA=examen.COD_ASIGNATURA
-                    ).EVALUADORES
-                except ObjectDoesNotExist:
-                    evaluadores = 0
-
-                # get_moves
-                if examen.COD_ASIGNATURA not in self.moves_data:
-                    asignatura = Asignatura.objects.get(COD_ASIGNATURA=examen.COD_ASIGNATURA_id)
-                    self.moves_data[examen.COD_ASIGNATURA_id] = get_moves(asignatura, examen.FECHA)
-                moves = self.moves_data[examen.COD_ASIGNATURA_id]
-
-                HQ = str(examen.COD_SEDE_id)
+            for examen in next_examenes:
+                evaluadores = evaluadores_by_sede.get((cod_sede, examen.COD_ASIGNATURA_id), 0)
+                moves = plans[moves_cache_key(examen.COD_ASIGNATURA_id, examen.FECHA)]
+
+                HQ = cod_sede
                 if "move_details" in moves and moves["move_details"] is not None:
                     if HQ in moves["move_details"]:
                         for to_HQ in moves["move_details"][HQ].keys():
@@ -324,8 +512,14 @@ class MovesXLSView(LoginRequiredMixin, View):
                                     from_HQ,  # asignatura.recibido_sede_origen
                                 ]
                                 ws.append(row_data)
-        # Save the workbook to the response
+            next_sede, next_examenes = next(examenes_by_sede, (None, []))
+        while next_sede is not None:
+            logger.warning(f"Sede {next_sede} is not in the sede directory, its exams are left out of the XLS")
+            next_sede, next_examenes = next(examenes_by_sede, (None, []))
+        # Save the workbook and stream it from disk
         logger.debug("saving workbook")
-        wb.save(response)
+        file = tempfile.TemporaryFile()
+        wb.save(file)
+        file.seek(0)
 
-        return response
+        return FileResponse(file, as_attachment=True, filename="sede_data.xlsx", content_type="application/ms-excel")